@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# -------------------
+# offline benchmark
+# -------------------
+# runs the /wordquiz and /pickword handlers from bot.py against the local WordNet copy
+# with fake interactions (no Discord connection).
+#
+#   python bench.py                       -> bench_results.json
+#   python bench.py -n 500 --out new.json --compare old.json
+#   python bench.py --prefetch            -> keep the quiz prefetch queues on
+
+MODES = ["easy", "normal", "similar", "hard"]
+CHOICES = [str(n) for n in range(2, 11)]
+
+# counters read before / after every case
+COUNTERS = [
+    "lexicon_sample_draws_total",
+    "lexicon_sample_rejected_total",
+    "lexicon_sample_scans_total",
+    "lexicon_executor_timeouts_total",
+    "lexicon_executor_rejected_total",
+    "quiz_prefetch_hits_total",
+]
+
+
+# -------------------
+# fake discord objects
+# -------------------
+class FakeChannel:
+    id = 1
+
+
+class FakeMessage:
+    _ids = itertools.count(1)
+
+    def __init__(self, content=None, view=None, embed=None):
+        self.id = next(self._ids)
+        self.channel = FakeChannel()
+        self.content = content
+        self.view = view
+        self.embed = embed
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self.interaction.messages.append(FakeMessage(content, kwargs.get("view"), kwargs.get("embed")))
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        self.interaction.messages.append(FakeMessage(content, kwargs.get("view"), kwargs.get("embed")))
+
+
+class FakeInteraction:
+    token = "bench"
+
+    def __init__(self, client):
+        self.client = client
+        self.messages = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.extras = {}
+
+    async def original_response(self):
+        return self.messages[-1]
+
+
+# -------------------
+# cases
+# -------------------
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def is_quiz(interaction):
+    return any(m.view is not None for m in interaction.messages)
+
+
+def is_word(interaction):
+    return any(m.content and m.content.startswith("📝") for m in interaction.messages)
+
+
+async def run_case(bot_module, callback, kwargs, ok, iterations):
+    import metrics
+
+    def counters():
+        return {k[0]: m.get() for k, m in metrics.REGISTRY.items() if k[0] in COUNTERS and not k[1]}
+
+    before = counters()
+    latencies = []
+    failures = {}
+
+    for _ in range(iterations):
+        interaction = FakeInteraction(bot_module.bot)
+
+        start = time.perf_counter()
+        await callback(interaction, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        if not ok(interaction):
+            reason = interaction.messages[-1].content if interaction.messages else "no response"
+            failures[reason] = failures.get(reason, 0) + 1
+
+    after = counters()
+
+    return {
+        "n": iterations,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies),
+        "failures": sum(failures.values()),
+        "failure_reasons": failures,
+        "counters": {k: after.get(k, 0) - before.get(k, 0) for k in COUNTERS},
+    }
+
+
+async def run(args):
+    if not args.prefetch:
+        os.environ["QUIZ_PREFETCH"] = ""
+
+    import bot as bot_module
+    from discord import app_commands
+
+    client = bot_module.bot
+
+    start = time.perf_counter()
+    await client.load_lexicon()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    if args.prefetch:
+        # let the queues fill once before measuring
+        await asyncio.sleep(args.warmup)
+
+    tracemalloc.start()
+    results = {}
+
+    cases = [("pickword", bot_module.pickword.callback, {}, is_word)]
+    for mode in MODES:
+        for choices in CHOICES:
+            kwargs = {"mode": app_commands.Choice(name=mode, value=mode), "choices": choices}
+            cases.append((f"wordquiz {mode} {choices}", bot_module.wordquiz.callback, kwargs, is_quiz))
+    kwargs = {"mode": app_commands.Choice(name="hard", value="hard"), "choices": "hell"}
+    cases.append(("wordquiz hard hell", bot_module.wordquiz.callback, kwargs, is_quiz))
+
+    for name, callback, kwargs, ok in cases:
+        if args.only and args.only not in name:
+            continue
+        results[name] = result = await run_case(bot_module, callback, kwargs, ok, args.iterations)
+        print(f"{name:<22} p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  "
+              f"p99 {result['p99_ms']:8.2f}ms  fail {result['failures']}  "
+              f"rejected draws {result['counters']['lexicon_sample_rejected_total']}")
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    client.quiz_prefetch.stop()
+    client.lexicon_pool.shutdown()
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "executor": client.lexicon_pool.kind,
+        "prefetch": args.prefetch,
+        "iterations": args.iterations,
+        "lexicon_load_ms": load_ms,
+        "peak_traced_bytes": peak,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "results": results,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new):
+    print(f"\nvs {old.get('commit')}:")
+    for name, result in new["results"].items():
+        before = old.get("results", {}).get(name)
+        if not before:
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if before[key]:
+                deltas.append(f"{key[:3]} {100 * (result[key] - before[key]) / before[key]:+6.1f}%")
+        print(f"{name:<22} " + "  ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quiz / word generation without Discord")
+    parser.add_argument("-n", "--iterations", type=int, default=200)
+    parser.add_argument("--only", help="only cases containing this text, e.g. 'hard'")
+    parser.add_argument("--prefetch", action="store_true", help="keep the quiz prefetch queues on")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds to fill prefetch queues")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="previous results file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResults written to {args.out} (peak traced {report['peak_traced_bytes'] / 1024 / 1024:.1f}MB, "
+          f"max RSS {report['max_rss_kb'] / 1024:.1f}MB)")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
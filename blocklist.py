@@ -0,0 +1,78 @@
+import os
+from collections import deque
+
+DEFAULT_TERMS = ["yaoi"]
+
+
+# -------------------
+# blocklist
+# -------------------
+class Blocklist:
+    # Aho-Corasick automaton over every blocked term: one pass over the text finds
+    # any of them as a substring, however many terms there are
+    def __init__(self, terms):
+        self.terms = sorted({t.strip().lower() for t in terms if t.strip()})
+
+        self.goto = [{}]     # state -> {char: state}
+        self.fail = [0]
+        self.match = [None]  # state -> a term ending here (own or through fail links)
+
+        for term in self.terms:
+            state = 0
+            for ch in term:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = self.goto[state][ch] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.match.append(None)
+                state = nxt
+            self.match[state] = term
+
+        # fail links breadth first
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                if self.match[nxt] is None:
+                    self.match[nxt] = self.match[self.fail[nxt]]
+
+    def __len__(self):
+        return len(self.terms)
+
+    def search(self, text):
+        # first blocked term found in text, or None
+        goto, fail, match = self.goto, self.fail, self.match
+        state = 0
+
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if match[state] is not None:
+                return match[state]
+
+        return None
+
+
+def load_blocklist():
+    # DEFAULT_TERMS + BLOCKLIST (comma separated) + BLOCKLIST_FILE (one term per line, # comments)
+    terms = list(DEFAULT_TERMS)
+    terms += os.getenv("BLOCKLIST", "").split(",")
+
+    path = os.getenv("BLOCKLIST_FILE")
+    if path:
+        try:
+            with open(path, encoding="utf-8") as f:
+                terms += [line.split("#", 1)[0] for line in f]
+        except OSError as e:
+            print("Failed to read blocklist file:", e)
+
+    blocklist = Blocklist(terms)
+    print(f"Blocklist loaded: {len(blocklist)} terms")
+    return blocklist
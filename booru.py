@@ -0,0 +1,267 @@
+import asyncio
+import codecs
+import json
+import math
+import os
+import random
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from contextlib import aclosing
+import aiohttp
+import metrics
+from upstream import SingleFlight, TTLCache, UpstreamError
+
+SAFEBOORU_API = "https://safebooru.org/index.php"
+SAFEBOORU_IMAGES = "https://safebooru.org/images"
+
+CHUNK_SIZE = 16 * 1024
+MAX_JSON_ITEM = 256 * 1024   # one post object; bounds the parse buffer
+
+
+class BooruError(Exception):
+    # message is sent to the user as is
+    pass
+
+
+def normalize_tags(tag):
+    # "Blue_Sky, cat  cat" -> "blue_sky cat" (tag order doesn't change the search)
+    if not tag:
+        return ""
+    return " ".join(sorted(set(tag.replace(",", " ").lower().split())))
+
+
+# -------------------
+# streaming json
+# -------------------
+async def iter_json_array(chunks, max_item=MAX_JSON_ITEM):
+    # yields the objects of a top level JSON array as the byte chunks arrive.
+    # only the current (unfinished) object is buffered. empty body -> nothing
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    started = False
+
+    async for chunk in chunks:
+        buf += utf8.decode(chunk)
+        pos = 0
+
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buf):
+                break
+
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("not a JSON array")
+                started = True
+                pos += 1
+                continue
+
+            if buf[pos] == "]":
+                return
+            if buf[pos] != "{":
+                raise ValueError("expected an object")
+
+            try:
+                item, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break   # object continues in the next chunk
+            yield item
+
+        buf = buf[pos:]
+        if len(buf) > max_item:
+            raise ValueError("JSON object too large")
+
+    if started or buf.strip():
+        raise ValueError("truncated JSON array")
+
+
+# -------------------
+# post pool
+# -------------------
+class PostPool:
+    # shuffled "directory/image" paths of one tag query, popped from the end -> no repeats
+    __slots__ = ("paths", "pages_seen", "filled_at")
+
+    def __init__(self):
+        self.paths = []
+        self.pages_seen = set()
+        self.filled_at = time.monotonic()
+
+
+# -------------------
+# safebooru
+# -------------------
+class Safebooru:
+    # BOORU_COUNT_TTL (seconds), BOORU_COUNT_CACHE (tag queries kept)
+    # BOORU_PAGE_SIZE (posts per fetch), BOORU_POOL_TTL (seconds), BOORU_POOL_POSTS (posts kept over all pools)
+    # BOORU_POOL_KEEP (posts kept per page), BOORU_SCAN_LIMIT (stop reading a page after this many usable posts)
+    # defaults keep 20 of the first 80 usable posts, so a full page of 100 is sampled and cut short
+    def __init__(self, client, blocklist=None):
+        self.client = client
+        # posts whose tags hit the blocklist never make it into a pool
+        self.blocklist = blocklist
+        self.counts = TTLCache(
+            "safebooru_count",
+            ttl=float(os.getenv("BOORU_COUNT_TTL", 600)),
+            maxsize=int(os.getenv("BOORU_COUNT_CACHE", 1024)),
+        )
+
+        self.page_size = int(os.getenv("BOORU_PAGE_SIZE", 100))
+        self.pool_ttl = float(os.getenv("BOORU_POOL_TTL", 1800))
+        self.pool_posts = int(os.getenv("BOORU_POOL_POSTS", 50000))
+        self.pool_keep = int(os.getenv("BOORU_POOL_KEEP", 20))
+        self.scan_limit = int(os.getenv("BOORU_SCAN_LIMIT", min(4 * self.pool_keep, self.page_size)))
+        self.pools = OrderedDict()   # tag query -> PostPool, least recently used first
+
+        self.pool_hits = metrics.counter("booru_pool_hits_total", "Images served from a post pool")
+        self.pool_refills = metrics.counter("booru_pool_refills_total", "Post pages fetched into a pool")
+        self.pool_evictions = metrics.counter("booru_pool_evictions_total", "Post pools dropped (size or age)")
+        metrics.gauge("booru_pool_posts", "Posts held over all pools", fn=self._pooled)
+        self.posts_parsed = metrics.counter("booru_posts_parsed_total", "Post objects parsed from pages")
+        self.early_stops = metrics.counter("booru_page_early_stops_total", "Pages not read to the end")
+        self.blocked = metrics.counter("booru_posts_blocked_total", "Posts dropped by the blocklist")
+        # a burst on one tag refills its pool once
+        self.refills = SingleFlight("safebooru_refill")
+
+    async def count(self, tags):
+        # total posts for a normalized tag query
+        return await self.counts.get(tags, lambda: self._fetch_count(tags))
+
+    async def _fetch_count(self, tags):
+        params = {
+            "page": "dapi",
+            "s": "post",
+            "q": "index",
+            "tags": tags,
+            "limit": 1,
+        }
+
+        try:
+            status, xml_text = await self.client.fetch(SAFEBOORU_API, params)
+        except (aiohttp.ClientError, asyncio.TimeoutError, UpstreamError):
+            raise BooruError("⚠️ Failed to get count")
+        if status != 200:
+            raise BooruError("⚠️ Failed to get count")
+
+        try:
+            with metrics.span("xml_parse", target="safebooru"):
+                root = ET.fromstring(xml_text)
+            return int(root.attrib.get("count", 0))
+        except (ET.ParseError, ValueError):
+            raise BooruError("⚠️ Failed to parse XML count")
+
+    # --- images ---
+    async def random_image(self, tags, total):
+        # image url for a tag query with `total` posts, drawn without replacement
+        pool = self._pool(tags)
+
+        if pool.paths:
+            self.pool_hits.inc()
+        elif not await self.refills.do_until(tags, lambda: self._refill(tags, pool, total), lambda: pool.paths):
+            raise BooruError("⚠️ No images found in this range")
+
+        return f"{SAFEBOORU_IMAGES}/{pool.paths.pop()}"
+
+    def _pool(self, tags):
+        pool = self.pools.get(tags)
+
+        # old pools may point at deleted posts and miss new ones
+        if pool is not None and time.monotonic() - pool.filled_at > self.pool_ttl:
+            del self.pools[tags]
+            self.pool_evictions.inc()
+            pool = None
+
+        if pool is None:
+            pool = self.pools[tags] = PostPool()
+        self.pools.move_to_end(tags)
+        return pool
+
+    async def _refill(self, tags, pool, total):
+        pages = max(1, math.ceil(total / self.page_size))
+
+        if len(pool.pages_seen) >= pages:
+            pool.pages_seen.clear()
+
+        # random page not taken yet
+        if len(pool.pages_seen) * 2 > pages:
+            page = random.choice([p for p in range(pages) if p not in pool.pages_seen])
+        else:
+            page = random.randrange(pages)
+            while page in pool.pages_seen:
+                page = random.randrange(pages)
+
+        paths = await self._fetch_page(tags, page)
+        random.shuffle(paths)
+
+        pool.pages_seen.add(page)
+        pool.paths.extend(paths)
+        self.pool_refills.inc()
+        self._evict()
+
+    def _pooled(self):
+        return sum(len(p.paths) for p in self.pools.values())
+
+    def _evict(self):
+        # least recently used pools go first, the one just used stays
+        while len(self.pools) > 1 and self._pooled() > self.pool_posts:
+            self.pools.popitem(last=False)
+            self.pool_evictions.inc()
+
+    async def _fetch_page(self, tags, page):
+        params = {
+            "page": "dapi",
+            "s": "post",
+            "q": "index",
+            "json": 1,
+            "limit": self.page_size,
+            "pid": page,
+            "tags": tags,
+        }
+
+        try:
+            async with self.client.request(SAFEBOORU_API, params) as resp:
+                if resp.status != 200:
+                    raise BooruError("⚠️ Failed to load JSON")
+                # body download + streaming json parse
+                with metrics.span("booru_page", target="safebooru"):
+                    return await self._sample_posts(resp)
+        except (aiohttp.ClientError, asyncio.TimeoutError, UpstreamError):
+            raise BooruError("⚠️ Failed to load JSON")
+        except ValueError:
+            raise BooruError("⚠️ Server returned invalid JSON")
+
+    async def _sample_posts(self, resp):
+        # reservoir sample of pool_keep paths, parsed while the body streams in
+        kept = []
+        usable = 0
+
+        async with aclosing(iter_json_array(resp.content.iter_chunked(CHUNK_SIZE))) as posts:
+            async for post in posts:
+                self.posts_parsed.inc()
+
+                directory = post.get("directory")
+                image = post.get("image")
+                if not directory or not image:
+                    continue
+                if self.blocklist and self.blocklist.search(post.get("tags", "")):
+                    self.blocked.inc()
+                    continue
+
+                usable += 1
+                path = f"{directory}/{image}"
+                if len(kept) < self.pool_keep:
+                    kept.append(path)
+                else:
+                    j = random.randrange(usable)
+                    if j < self.pool_keep:
+                        kept[j] = path
+
+                # the rest of the page is never read
+                if usable >= self.scan_limit:
+                    self.early_stops.inc()
+                    break
+
+        return kept
@@ -2,180 +2,344 @@ import random
 import discord
 from discord.ext import commands
 from discord import app_commands
-import nltk
-from nltk.corpus import wordnet
-import aiohttp
-import xml.etree.ElementTree as ET
-import json
+from lexicon import get_lexicon
+from quiz import QuizError, make_quiz, pick_word
+from workers import LexiconBusy, LexiconExecutor, QuizPrefetcher
+from sessions import QuizChoice, QuizSessions, quiz_view
+from upstream import HttpClient
+from booru import BooruError, Safebooru, normalize_tags
+from giphy import Giphy, GiphyError
+from blocklist import load_blocklist
+from emojis import EmojiIndex
+from sampling import (
+    FAST_TRIALS, MAX_INLINE, MAX_PICKS, MAX_TRIALS, parse_weighted, pick_floats, pick_ints, pick_weighted,
+    fit_file, run_trials, summary, tally, wilson_interval
+)
 from dotenv import load_dotenv
 import os
-import socket
+import asyncio
+import math
+import signal
 import time
+import hashlib
+import json
+import metrics
+from urllib.parse import urlsplit
+
+
+def parse_target(target, default_port=53):
+    # "host", "host:port" or "[v6 address]:port" -> (host, port)
+    try:
+        parts = urlsplit(f"//{target.strip()}")
+        host, port = parts.hostname, parts.port
+    except ValueError:
+        host = port = None
+    if not host:
+        raise ValueError(f"CONNECTIVITY_TARGET must look like host or host:port, got {target!r}")
+    return host, port or default_port
+
+
+async def wait_for_internet():
+    # CONNECTIVITY_TARGET = host[:port] to probe (port 53 by default), retried with exponential backoff
+    host, port = parse_target(os.getenv("CONNECTIVITY_TARGET", "8.8.8.8:53"))
+    delay = 1
 
-def wait_for_internet():
     while True:
         try:
-            socket.create_connection(("8.8.8.8", 53), timeout=3)
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=3)
+            writer.close()
+            await writer.wait_closed()
             print("Internet connection is successful! Start the bot!")
             break
-        except OSError:
-            print("Internet connection failed... retry in 5 seconds...")
-            time_interval = 5
-            time.sleep(time_interval)
+        except (OSError, asyncio.TimeoutError):
+            print(f"Internet connection failed... retry in {delay} seconds...")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
 
 
-# WordNet download
-nltk.download('wordnet')
+load_dotenv()
 
 # Discord intents
 intents = discord.Intents.default()
 
-# bot class
-class RandomPickBot(commands.Bot):
-    def __init__(self):
-        super().__init__(command_prefix="!", intents=intents)
+# hash of the last synced command tree
+COMMAND_HASH_FILE = os.getenv("COMMAND_HASH_FILE") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "cache", "command_tree.sha256"
+)
 
-bot = RandomPickBot()
 
-# get wordnet wordlist 
-WORD_LIST = list({lemma.name() for syn in wordnet.all_synsets() for lemma in syn.lemmas()})
-print(f"Word list loaded: {len(WORD_LIST)} words")
+def parse_shard_ids(text):
+    # "0-3,8" -> [0, 1, 2, 3, 8]
+    ids = []
+    for part in text.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = part.split("-")
+            ids.extend(range(int(first), int(last) + 1))
+        elif part:
+            ids.append(int(part))
+    return ids
 
-class WordQuizView(discord.ui.View):
-    def __init__(self, options, correct_word, definition, header="", timeout=30):
-        super().__init__(timeout=timeout)
 
-        self.correct_word = correct_word
-        self.definition = definition
-        self.answered = False
-        self.header = header
+def shard_options():
+    # SHARD_COUNT (+ SHARD_IDS) -> run only those shards in this process (see launcher.py).
+    # neither set -> Discord's recommended shard count, all in this process
+    options = {}
+    if os.getenv("SHARD_COUNT"):
+        options["shard_count"] = int(os.getenv("SHARD_COUNT"))
+        if os.getenv("SHARD_IDS"):
+            options["shard_ids"] = parse_shard_ids(os.getenv("SHARD_IDS"))
+    return options
 
-        for option in options:
-            self.add_item(QuizButton(option, correct_word, self))
 
-    async def on_timeout(self):
-        if self.answered:
-            return
+# -------------------
+# command timing
+# -------------------
+class InstrumentedTree(app_commands.CommandTree):
+    # every app command: start here, end in on_app_command_completion / on_error
+    async def interaction_check(self, interaction: discord.Interaction):
+        interaction.extras["started"] = time.perf_counter()
+        lag = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        metrics.histogram("command_gateway_lag_seconds", "Interaction created -> handler start").observe(max(0.0, lag))
+        return True
+
+    async def on_error(self, interaction, error):
+        record_command(interaction, "error")
+        await super().on_error(interaction, error)
+
+
+def record_command(interaction, status):
+    started = interaction.extras.pop("started", None)
+    if started is None:
+        return
 
-        self.answered = True
+    now = time.perf_counter()
+    command = interaction.command.qualified_name if interaction.command else "unknown"
+    metrics.histogram("command_seconds", "App command latency", command=command, status=status).observe(now - started)
 
-        for item in self.children:
-            item.disabled = True
+    deferred = interaction.extras.pop("deferred_at", None)
+    if deferred is not None:
+        metrics.histogram("command_defer_to_followup_seconds", "Defer -> last followup", command=command).observe(now - deferred)
 
-            if normalize(item.label) == normalize(self.correct_word):
-                item.style = discord.ButtonStyle.success
-            else:
-                item.style = discord.ButtonStyle.danger
 
-        await self.message.edit(
-            content=f"{self.header}"
-                    f"📖 Definition:\n{self.definition}\n\n"
-                    "<:mikucry:1441064496041820221>\n"
-                    f"Time's up!\nCorrect answer: **{self.correct_word}**",
-            view=self
-        )
-class QuizButton(discord.ui.Button):
-    def __init__(self, label, correct_word, parent_view):
-        super().__init__(label=label, style=discord.ButtonStyle.primary)
-        self.correct_word = correct_word
-        self.parent_view = parent_view
-
-    async def callback(self, interaction: discord.Interaction):
-        if self.parent_view.answered:
-            return
+async def defer(interaction):
+    # interaction.response.defer() + defer-to-followup timing
+    interaction.extras["deferred_at"] = time.perf_counter()
+    await interaction.response.defer()
 
-        self.parent_view.answered = True
 
-        for item in self.parent_view.children:
-            item.disabled = True
+# bot class
+class RandomPickBot(commands.AutoShardedBot):
+    def __init__(self):
+        super().__init__(command_prefix="!", intents=intents, tree_cls=InstrumentedTree, **shard_options())
+        # WordNet / lexicon work runs here, never on the event loop
+        self.lexicon_pool = LexiconExecutor()
+        # ready-made quizzes for the popular (mode, choices)
+        self.quiz_prefetch = QuizPrefetcher(self.lexicon_pool)
+        # set once the lexicon is loaded; lexicon commands answer "warming up" until then
+        self.lexicon_ready = asyncio.Event()
+        # every live quiz + one timer for all of them
+        self.quiz_sessions = QuizSessions(self)
+        # one pooled session for Safebooru / GIPHY (keep-alive, DNS cache)
+        self.http_client = HttpClient()
+        # blocked terms, checked on /randompic queries and on every post's tags
+        self.blocklist = load_blocklist()
+        # Safebooru API + tag count cache
+        self.safebooru = Safebooru(self.http_client, self.blocklist)
+        # GIPHY search totals / result buffers + ready-made random GIFs
+        self.giphy = Giphy(self.http_client)
+        # custom emojis of every guild, kept current from guild events
+        self.emoji_index = EmojiIndex()
+        # METRICS_PORT server + periodic metric logs / loop lag watch
+        self._metrics_server = None
+        self._metrics_tasks = []
+
+    async def setup_hook(self):
+        await self.http_client.start()
+        self.giphy.start()
+
+        # METRICS_PORT -> Prometheus text on METRICS_HOST (127.0.0.1):port/metrics
+        # METRICS_LOG_INTERVAL -> one JSON metrics line every N seconds
+        if os.getenv("METRICS_PORT"):
+            self._metrics_server = await metrics.serve(
+                int(os.getenv("METRICS_PORT")), os.getenv("METRICS_HOST", "127.0.0.1")
+            )
+        if os.getenv("METRICS_LOG_INTERVAL"):
+            interval = float(os.getenv("METRICS_LOG_INTERVAL"))
+            self._metrics_tasks.append(asyncio.create_task(metrics.log_periodically(interval)))
+        self._metrics_tasks.append(asyncio.create_task(metrics.watch_loop_lag()))
 
-            if normalize(item.label) == normalize(self.correct_word):
-                item.style = discord.ButtonStyle.success
-            else:
-                item.style = discord.ButtonStyle.danger
+        # once per process, not on every (re)connect
+        try:
+            await self.sync_commands()
+        except Exception as e:
+            print("Error during command sync:", e)
 
-        if normalize(self.label) == normalize(self.correct_word):
-            result = "<:mikuwow:1441065277579198525>\n"
-            f"You're Right! Correct answer: **{self.correct_word}**"
-        else:
-            result = (
-                "<:mikucry:1441064496041820221>\n"
-                f"It's Wrong... Correct answer: **{self.correct_word}**"
-            )
+        # quiz buttons keep working across restarts
+        self.add_dynamic_items(QuizChoice)
+        self.quiz_sessions.load()
+        self.quiz_sessions.start()
 
-        await interaction.response.edit_message(
-            content=f"{self.parent_view.header}"
-                    f"📖 Definition:\n{self.parent_view.definition}\n\n{result}",
-            view=self.parent_view
-        )
+        # the gateway connects right away, the lexicon loads next to it
+        self._lexicon_task = asyncio.create_task(self.load_lexicon())
 
-def normalize(word):
-    return word.replace("_", " ").replace("-", " ").lower().strip()
+    def command_tree_hash(self):
+        commands = [cmd.to_dict(self.tree) for cmd in self.tree.get_commands()]
+        payload = json.dumps([self.application_id, commands], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
 
-def get_syn_ant_hard(word):
-    synsets = wordnet.synsets(word)
-    if not synsets:
-        return [], []
+    async def sync_commands(self):
+        # sync only when the tree changed since the last sync (SYNC_COMMANDS=1 forces it).
+        # with launcher.py only the process holding shard 0 syncs; stub mode never logs in
+        if self.application_id is None or (self.shard_ids and 0 not in self.shard_ids):
+            return
 
-    syn = synsets[0]
+        tree_hash = self.command_tree_hash()
+        try:
+            with open(COMMAND_HASH_FILE, encoding="utf-8") as f:
+                synced_hash = f.read().strip()
+        except OSError:
+            synced_hash = None
 
-    synonyms = set()
-    antonyms = set()
+        if cachekill:
+            # one bulk overwrite instead of a delete per command
+            await self.http.bulk_upsert_global_commands(self.application_id, [])
+            print("Deleted all global commands")
+        elif tree_hash == synced_hash and not os.getenv("SYNC_COMMANDS"):
+            print("Commands unchanged, sync skipped")
+            return
 
-    for lemma in syn.lemmas():
-        name = lemma.name().replace("_", " ").replace("-", " ")
+        # global sync
+        synced = await self.tree.sync()
+        print(f"Global commands synced: {len(synced)}")
+        print("Commands:", [cmd.name for cmd in synced])
 
-        if name != word:
-            synonyms.add(name)
+        os.makedirs(os.path.dirname(COMMAND_HASH_FILE) or ".", exist_ok=True)
+        with open(COMMAND_HASH_FILE, "w", encoding="utf-8") as f:
+            f.write(tree_hash)
 
-        for ant in lemma.antonyms():
-            antonyms.add(
-                ant.name().replace("_", " ").replace("-", " ")
-            )
+    async def load_lexicon(self):
+        delay = 5
 
-    return list(synonyms), list(antonyms)
+        while True:
+            try:
+                # get wordnet wordlist + index (POS / proper / definition / normalized / pools)
+                # compiled once into cache/lexicon.bin, mmapped on later starts
+                lexicon = await asyncio.get_running_loop().run_in_executor(None, get_lexicon)
+                break
+            except Exception as e:
+                print(f"Failed to load lexicon, retry in {delay} seconds...", e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 300)
+
+        print(f"Word list loaded: {len(lexicon)} words")
+
+        self.lexicon_pool.start()
+        self.quiz_prefetch.start()
+        self.lexicon_ready.set()
+
+    async def close(self):
+        self.quiz_sessions.stop()
+        self.quiz_sessions.save()
+        self.quiz_prefetch.stop()
+        self.lexicon_pool.shutdown()
+        self.giphy.stop()
+        for task in self._metrics_tasks:
+            task.cancel()
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+        await self.http_client.close()
+        await super().close()
+
+bot = RandomPickBot()
+
+BUSY_MESSAGE = "⏳ The dictionary is busy right now... try again in a moment!"
+WARMING_UP_MESSAGE = "⏳ Warming up the dictionary... try again in a few seconds!"
+TOO_LARGE_MESSAGE = "⚠️ Result too large to attach"
+DM_FILESIZE_LIMIT = 10 * 1024 * 1024   # guild.filesize_limit outside of a guild
 
 # -------------------
 # bot event
 # -------------------
-cachekill = False  # True -> init global cache
+cachekill = False  # True -> init global cache (on the next start)
 
 @bot.event
 async def on_ready():
     print(f"Logged in as {bot.user}")
 
-    try:
-        if cachekill:
-            app_id = bot.user.id  # bot app ID
-            # get global command
-            all_global = await bot.tree.fetch_commands(guild=None)
-            
-            deleted_count = 0
-            for cmd in all_global:
-                await bot.http.delete_global_command(app_id, cmd.id)
-                deleted_count += 1
-            print(f"Deleted {deleted_count} global commands")
+    bot.emoji_index.rebuild(bot.guilds)
+    print(f"Emojis indexed: {len(bot.emoji_index)}")
+    # command sync happens once in setup_hook
 
-        # global sync
-        synced = await bot.tree.sync()
-        print(f"Global commands synced: {len(synced)}")
-        print("Commands:", [cmd.name for cmd in synced])
 
-    except Exception as e:
-        print("Error during global cache reset:", e)
+@bot.event
+async def on_app_command_completion(interaction, command):
+    record_command(interaction, "ok")
+
+
+@bot.event
+async def on_guild_emojis_update(guild, before, after):
+    bot.emoji_index.set_guild(guild.id, after)
 
 
+@bot.event
+async def on_guild_join(guild):
+    bot.emoji_index.set_guild(guild.id, guild.emojis)
+
+
+@bot.event
+async def on_guild_remove(guild):
+    bot.emoji_index.remove_guild(guild.id)
+
 
 
 # -------------------
 # /picknumber
 # -------------------
+async def send_file(interaction, content, values, name):
+    # values go out as name.txt (gzipped when over the upload limit), summary only if even that is too big
+    limit = interaction.guild.filesize_limit if interaction.guild else DM_FILESIZE_LIMIT
+    fitted = await asyncio.get_running_loop().run_in_executor(None, fit_file, values, limit)
+    if fitted is not None:
+        buf, ext = fitted
+        try:
+            await interaction.followup.send(content, file=discord.File(buf, filename=f"{name}{ext}"))
+            return
+        except discord.HTTPException as e:
+            if e.status != 413:
+                raise
+    await interaction.followup.send(f"{content}\n{TOO_LARGE_MESSAGE}")
+
+
+async def send_picks(interaction, name, icon, min, max, draw, is_int):
+    # count > 1: drawn off the event loop, long results go out as a file + summary
+    await defer(interaction)
+
+    try:
+        values = await asyncio.get_running_loop().run_in_executor(None, draw)
+    except ValueError as e:
+        await interaction.followup.send(f"❌ {e}")
+        return
+
+    if len(values) <= MAX_INLINE:
+        picked = ", ".join(str(v) for v in (values.tolist() if hasattr(values, "tolist") else values))
+        await interaction.followup.send(f"{icon} The Chosen ones from {min} - {max}: **{picked}**")
+        return
+
+    text = await asyncio.get_running_loop().run_in_executor(None, summary, values, min, max, is_int)
+    await send_file(interaction, f"{icon} {len(values)} picks from {min} - {max}\n```\n{text}\n```", values, name)
+
+
 @bot.tree.command(name="picknumber", description="RandomNumberPicker")
-@app_commands.describe(min="min", max="max")
-async def picknumber(interaction: discord.Interaction, min: int, max: int):
+@app_commands.describe(min="min", max="max", count="how many numbers (default 1)", unique="no number twice")
+async def picknumber(interaction: discord.Interaction, min: int, max: int,
+                     count: app_commands.Range[int, 1, MAX_PICKS] = 1, unique: bool = False):
     if min > max:
         await interaction.response.send_message("No.")
         return
+    if count > 1:
+        await send_picks(interaction, "picknumber", "🎲", min, max, lambda: pick_ints(min, max, count, unique), True)
+        return
     value = random.randint(min, max)
     await interaction.response.send_message(f"🎲 The Chosen one from {min} - {max}: **{value}**")
 
@@ -183,14 +347,56 @@ async def picknumber(interaction: discord.Interaction, min: int, max: int):
 # /pickfloat
 # -------------------
 @bot.tree.command(name="pickfloat", description="RandomFloatPicker")
-@app_commands.describe(min="min", max="max")
-async def pickfloat(interaction: discord.Interaction, min: float, max: float):
+@app_commands.describe(min="min", max="max", count="how many numbers (default 1)", unique="no number twice")
+async def pickfloat(interaction: discord.Interaction, min: float, max: float,
+                    count: app_commands.Range[int, 1, MAX_PICKS] = 1, unique: bool = False):
     if min > max:
         await interaction.response.send_message("No.")
         return
+    if count > 1:
+        await send_picks(interaction, "pickfloat", "🌊", min, max, lambda: pick_floats(min, max, count, unique), False)
+        return
     value = random.uniform(min, max)
     await interaction.response.send_message(f"🌊 The Chosen one from {min} - {max}: **{value}**")
 
+# -------------------
+# /pickfrom
+# -------------------
+@bot.tree.command(name="pickfrom", description="Pick from your own list (item:weight for raffles)")
+@app_commands.describe(
+    items="comma separated, e.g. alice:3, bob, carol:0.5",
+    count="how many picks (default 1)",
+    unique="nobody picked twice"
+)
+async def pickfrom(interaction: discord.Interaction, items: str,
+                   count: app_commands.Range[int, 1, MAX_PICKS] = 1, unique: bool = False):
+    try:
+        names, weights = parse_weighted(items)
+        if count == 1:
+            picked = pick_weighted(names, weights, 1)
+    except ValueError as e:
+        await interaction.response.send_message(f"❌ {e}")
+        return
+
+    if count == 1:
+        await interaction.response.send_message(f"🎁 The Chosen one: **{picked[0]}**")
+        return
+
+    await defer(interaction)
+
+    try:
+        picked = await asyncio.get_running_loop().run_in_executor(None, pick_weighted, names, weights, count, unique)
+    except ValueError as e:
+        await interaction.followup.send(f"❌ {e}")
+        return
+
+    if len(picked) <= MAX_INLINE:
+        await interaction.followup.send(f"🎁 The Chosen ones: **{', '.join(picked)}**")
+        return
+
+    text = await asyncio.get_running_loop().run_in_executor(None, tally, picked)
+    await send_file(interaction, f"🎁 {len(picked)} picks from {len(names)} items\n```\n{text}\n```", picked, "pickfrom")
+
 # -------------------
 # /pickword
 # -------------------
@@ -199,14 +405,19 @@ async def pickfloat(interaction: discord.Interaction, min: float, max: float):
     description="WordNet WordPicker"
 )
 async def pickword(interaction: discord.Interaction):
-    #wait
-    await interaction.response.defer()
+    if not bot.lexicon_ready.is_set():
+        await interaction.response.send_message(WARMING_UP_MESSAGE)
+        return
 
-    word = random.choice(WORD_LIST)
+    #wait
+    await defer(interaction)
 
-    # get meaning
-    synsets = wordnet.synsets(word)
-    definition = synsets[0].definition() if synsets else "IDK"
+    # word + meaning
+    try:
+        word, definition = await bot.lexicon_pool.run(pick_word)
+    except (LexiconBusy, asyncio.TimeoutError):
+        await interaction.followup.send(BUSY_MESSAGE)
+        return
 
     await interaction.followup.send(f"📝 Word: **{word}**\nDefinition: {definition}")
 
@@ -219,12 +430,13 @@ async def pickword(interaction: discord.Interaction):
     description="Make Random English Quiz"
 )
 @app_commands.describe(
-    mode="easy | normal | hard",
+    mode="easy | normal | similar | hard",
     choices="2..10 or hell"
 )
 @app_commands.choices(mode=[
     app_commands.Choice(name="easy", value="easy"),
     app_commands.Choice(name="normal", value="normal"),
+    app_commands.Choice(name="similar", value="similar"),
     app_commands.Choice(name="hard", value="hard"),
 ])
 async def wordquiz(
@@ -263,237 +475,46 @@ async def wordquiz(
         )
         return
 
-    correct_word = random.choice(WORD_LIST)
-    synsets = wordnet.synsets(correct_word)
-
-    if not synsets:
-        await interaction.response.send_message("Failed to get word.")
+    if not bot.lexicon_ready.is_set():
+        await interaction.response.send_message(WARMING_UP_MESSAGE)
         return
 
-    definition = synsets[0].definition()
-    correct_pos = synsets[0].pos()
+    # prefetched quiz, else build one now
+    quiz = bot.quiz_prefetch.get(mode_value, choice_count, hell_mode)
 
-    wrong_words = []
-
-    # --------------------
-    # EASY
-    # --------------------
-    if mode_value == "easy":
-
-        wrong_needed = (choice_count - 1) if not hell_mode else 2
-
-        while len(wrong_words) < wrong_needed:
-            w = random.choice(WORD_LIST)
-            if w != correct_word and w not in wrong_words:
-                wrong_words.append(w)
-
-    # --------------------
-    # NORMAL
-    # --------------------
-    elif mode_value == "normal":
-
-        same_pos_words = []
-
-        for w in WORD_LIST:
-            if w == correct_word:
-                continue
-
-            syns = wordnet.synsets(w)
-            if not syns:
-                continue
-
-            if syns[0].pos() != correct_pos:
-                continue
-
-            # noun -> filter proper noun
-            if correct_pos == 'n':
-                if correct_word[0].isupper():
-                    if not w[0].isupper():
-                        continue
-                else:
-                    if w[0].isupper():
-                        continue
-
-            same_pos_words.append(w)
-
-        wrong_needed = choice_count - 1
-
-        if len(same_pos_words) < wrong_needed:
-            await interaction.response.send_message("Not enough same POS words.")
+    if quiz is None:
+        try:
+            quiz = await bot.lexicon_pool.run(make_quiz, mode_value, choice_count, hell_mode)
+        except QuizError as e:
+            await interaction.response.send_message(str(e))
             return
-
-        wrong_words = random.sample(same_pos_words, wrong_needed)
-
-    # --------------------
-    # HARD
-    # --------------------
-    elif mode_value == "hard":
-
-        # Hard words candidates
-        while True:
-            candidate = random.choice(WORD_LIST)
-            synsets = wordnet.synsets(candidate)
-
-            if not synsets:
-                continue
-
-            syn = synsets[0]
-
-            # no proper nouns
-            if syn.instance_hypernyms():
-                continue
-
-            definition = syn.definition()
-            syns, ants = get_syn_ant_hard(candidate)
-
-            # normalize
-            normalized_seen = set()
-            pool = []
-
-            for w in syns + ants:
-                n = normalize(w)
-
-                if n == normalize(candidate):
-                    continue
-
-                if n in normalized_seen:
-                    continue
-
-                normalized_seen.add(n)
-                pool.append(w)
-
-            # hell 
-            if hell_mode:
-                if len(pool) < 1:
-                    continue
-
-                correct_word = candidate
-                break
-
-            # just hard
-            else:
-                if len(pool) >= (choice_count - 1):
-                    correct_word = candidate
-                    break
-
-
-        # hell mode
-        if hell_mode:
-
-            min_choices = 20   # Hell min choices
-
-            # pool = syn + ant
-            normalized_seen = set()
-            pool = []
-
-            for w in syns + ants:
-                n = normalize(w)
-
-                if n == normalize(correct_word):
-                    continue
-
-                if n in normalized_seen:
-                    continue
-
-                normalized_seen.add(n)
-                pool.append(w)
-
-            # if lacking
-            if len(pool) < min_choices - 1:
-
-                same_pos_words = []
-
-                for w in WORD_LIST:
-                    if w == correct_word:
-                        continue
-
-                    synsets_w = wordnet.synsets(w)
-                    if not synsets_w:
-                        continue
-
-                    if synsets_w[0].pos() != syn.pos():
-                        continue
-
-                    n = normalize(w)
-
-                    if n == normalize(correct_word):
-                        continue
-
-                    if n in normalized_seen:
-                        continue
-
-                    same_pos_words.append(w)
-
-                random.shuffle(same_pos_words)
-
-                for w in same_pos_words:
-                    if len(pool) >= min_choices - 1:
-                        break
-
-                    n = normalize(w)
-                    normalized_seen.add(n)
-                    pool.append(w)
-                else:
-                    while len(pool) < min_choices - 1:
-                        w = random.choice(WORD_LIST)
-                        n = normalize(w)
-                        if n==normalize(correct_word):
-                            continue
-                        if n==normalized_seen:
-                            continue
-                        if n in pool:
-                            continue
-                        if w in pool:
-                            continue
-                        pool.append(w)
-
-
-
-            correct_word = candidate
-            choices_list = pool + [correct_word]
-            random.shuffle(choices_list)
-
-            view = WordQuizView(choices_list, correct_word, definition)
-
-            message = (
-                "⚠️ **Caution!** Hard mode will likely present problems that rely solely on luck to solve.\n\n"
-                f"📖 Definition:\n{definition}\n\n"
-                f"🔥 Hell Mode Activated\n"
-                f"⏳ You have 30 seconds!"
-            )
-
-            await interaction.response.send_message(content=message, view=view)
-            view.message = await interaction.original_response()
+        except (LexiconBusy, asyncio.TimeoutError):
+            await interaction.response.send_message(BUSY_MESSAGE)
             return
 
-        # --------------------
-        # just hard (2~10)
-        # --------------------
-        wrong_words = random.sample(pool, choice_count - 1)
-
-    # --------------------
-    # selections
-    # --------------------
-    if not hell_mode:
-        choices_list = wrong_words + [correct_word]
-        random.shuffle(choices_list)
-
-    view = WordQuizView(choices_list, correct_word, definition)
+    session = bot.quiz_sessions.new(quiz)
 
-    if mode_value == "hard":
+    if quiz.hell:
         message = (
             "⚠️ **Caution!** Hard mode will likely present problems that rely solely on luck to solve.\n\n"
-            f"📖 Definition:\n{definition}\n\n"
+            f"📖 Definition:\n{quiz.definition}\n\n"
+            f"🔥 Hell Mode Activated\n"
+            f"⏳ You have 30 seconds!"
+        )
+    elif quiz.mode == "hard":
+        message = (
+            "⚠️ **Caution!** Hard mode will likely present problems that rely solely on luck to solve.\n\n"
+            f"📖 Definition:\n{quiz.definition}\n\n"
             f"⏳ You have 30 seconds!"
         )
     else:
         message = (
-            f"📖 Definition:\n{definition}\n\n"
+            f"📖 Definition:\n{quiz.definition}\n\n"
             f"⏳ You have 30 seconds!"
         )
 
-    await interaction.response.send_message(content=message, view=view)
-    view.message = await interaction.original_response()
+    await interaction.response.send_message(content=message, view=quiz_view(session))
+    bot.quiz_sessions.add(session, interaction, await interaction.original_response())
 
 #randompic
 
@@ -503,39 +524,23 @@ async def wordquiz(
 )
 @app_commands.describe(tag="tag")
 async def randompic(interaction: discord.Interaction, tag: str = None):
-    await interaction.response.defer()
+    await defer(interaction)
 
-    if tag:
-        tag_query = tag.replace(",", " ").replace("  ", " ").strip()
-    else:
-        tag_query = ""
+    tag_query = normalize_tags(tag)
 
-    # Check for colon in tag
+    # Check for colon in tag (metatags like rating:)
     if tag and ":" in tag:
         await interaction.followup.send("NO.")
         return
-    if tag and "yaoi" in tag:
+    if bot.blocklist.search(tag_query):
         await interaction.followup.send("NO.")
+        return
 
-    # ----- (1) XML -> count -----
-    count_url = (
-        "https://safebooru.org/index.php?page=dapi&s=post&q=index"
-        f"&tags={tag_query}"
-        "&limit=1"
-    )
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(count_url) as resp:
-            if resp.status != 200:
-                await interaction.followup.send("⚠️ Failed to get count")
-                return
-            xml_text = await resp.text()
-
+    # ----- (1) XML -> count (cached per tag query) -----
     try:
-        root = ET.fromstring(xml_text)
-        total_count = int(root.attrib.get("count", 0))
-    except:
-        await interaction.followup.send("⚠️ Failed to parse XML count")
+        total_count = await bot.safebooru.count(tag_query)
+    except BooruError as e:
+        await interaction.followup.send(str(e))
         return
 
     # If the user searched with 2 or more tags and the total results are
@@ -549,49 +554,13 @@ async def randompic(interaction: discord.Interaction, tag: str = None):
         await interaction.followup.send("⚠️ No results for that tag")
         return
 
-    # ----- (2) offset range calc -----
-    limit = 5000
-    max_offset = max(total_count - limit, 0)
-    offset = random.randint(0, max_offset)
-
-    # ----- (3) JSON  -----
-    json_url = (
-        "https://safebooru.org/index.php?page=dapi&s=post&q=index"
-        f"&json=1&limit={limit}&offset={offset}"
-        f"&tags={tag_query}"
-    )
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(json_url) as resp:
-            if resp.status != 200:
-                await interaction.followup.send("⚠️ Failed to load JSON")
-                return
-
-            text = await resp.text()
-
-            # check JSON 
-            if not text.strip().startswith("["):
-                await interaction.followup.send("⚠️ Server returned invalid JSON")
-                return
-
-            data = json.loads(text)
-
-    if not data:
-        await interaction.followup.send("⚠️ No images found in this range")
-        return
-
-    # ----- (4) random choose -----
-    pic = random.choice(data)
-
-    directory = pic.get("directory")
-    image = pic.get("image")
-
-    if not directory or not image:
-        await interaction.followup.send("⚠️ Invalid image data")
+    # ----- (2) one post from the tag's pool -----
+    try:
+        image_url = await bot.safebooru.random_image(tag_query, total_count)
+    except BooruError as e:
+        await interaction.followup.send(str(e))
         return
 
-    image_url = f"https://safebooru.org/images/{directory}/{image}"
-
     embed = discord.Embed(
         title="🎨 Random Image!",
         description=f"Tag: {tag or 'None'}",
@@ -614,30 +583,21 @@ async def randompic(interaction: discord.Interaction, tag: str = None):
     emoji_type="gif/pic"  # gif = animated, pic = static
 )
 async def randomemoji(interaction: discord.Interaction, emoji_type: str = None):
-    await interaction.response.defer()
-
-    # assemble all custom emojis
-    all_emojis = []
-    for guild in bot.guilds:
-        all_emojis.extend(guild.emojis)
+    await defer(interaction)
 
-    if not all_emojis:
+    if not len(bot.emoji_index):
         await interaction.followup.send("⚠️ Bot has no custom emojis in any server.")
         return
 
     # type filter
     t = emoji_type.lower() if emoji_type else ""
-    if t == "gif":
-        all_emojis = [e for e in all_emojis if e.animated]
-    elif t == "pic":
-        all_emojis = [e for e in all_emojis if not e.animated]
+    emoji = bot.emoji_index.pick(t if t in ("gif", "pic") else None)
 
-    if not all_emojis:
+    if emoji is None:
         await interaction.followup.send(f"⚠️ No emojis found for type '{t}'")
         return
 
-    emoji = random.choice(all_emojis)
-    await interaction.followup.send(f"{str(emoji)}")
+    await interaction.followup.send(emoji)
 
 #testpercent
 
@@ -645,19 +605,40 @@ async def randomemoji(interaction: discord.Interaction, emoji_type: str = None):
     name="testpercent",
     description="Test success chance by percent"
 )
-@app_commands.describe(percent="Success probability (0~100)")
-async def testpercent(interaction: discord.Interaction, percent: float):
+@app_commands.describe(percent="Success probability (0~100)", trials="run this many tries at once (default 1)")
+async def testpercent(interaction: discord.Interaction, percent: float,
+                      trials: app_commands.Range[int, 1, MAX_TRIALS] = 1):
     if percent < 0 or percent > 100:
         await interaction.response.send_message("❌ Percent must be between 0 and 100")
         return
 
+    if trials > 1:
+        await send_trials(interaction, percent, trials)
+        return
+
+    # one response, emoji included
     roll = random.uniform(0, 100)
     if roll < percent:
-        await interaction.response.send_message(f"Success! ({percent}% chance)")
-        await interaction.followup.send("<:mikuwow:1441065277579198525>")
+        await interaction.response.send_message(f"Success! ({percent}% chance)\n<:mikuwow:1441065277579198525>")
     else:
-        await interaction.response.send_message(f"Failed... ({percent}% chance)")
-        await interaction.followup.send("<:mikucry:1441064496041820221> ")
+        await interaction.response.send_message(f"Failed... ({percent}% chance)\n<:mikucry:1441064496041820221>")
+
+
+async def send_trials(interaction, percent, trials):
+    # a binomial draw answers right away; the plain python loop runs off the event loop
+    if FAST_TRIALS:
+        successes = run_trials(percent / 100, trials)
+        send = interaction.response.send_message
+    else:
+        await defer(interaction)
+        successes = await asyncio.get_running_loop().run_in_executor(None, run_trials, percent / 100, trials)
+        send = interaction.followup.send
+
+    low, high = wilson_interval(successes, trials)
+    await send(
+        f"🎯 {trials:,} tries at {percent}%: **{successes:,}** successes ({successes / trials:.4%})\n"
+        f"95% interval: {low:.4%} - {high:.4%}"
+    )
 
 #FAQ
 
@@ -693,100 +674,46 @@ async def faq(interaction: discord.Interaction):
 )
 @app_commands.describe(search="Search keyword (optional)")
 async def randomgif(interaction: discord.Interaction, search: str = None):
-    await interaction.response.defer()
-
-    rating = "pg-13"
-
-    async with aiohttp.ClientSession() as session:
-
-        # =====================================================
-        # if search
-        # =====================================================
-        if search:
-            try:
-                # check total
-                params = {
-                    "api_key": GIPHY,
-                    "q": search,
-                    "limit": 1,
-                    "rating": rating
-                }
-
-                async with session.get(GIPHY_SEARCH_URL, params=params) as resp:
-                    if resp.status != 200:
-                        await interaction.followup.send(
-                            f"⚠️ GIPHY search failed (HTTP {resp.status})"
-                        )
-                        return
-
-                    data = await resp.json()
-
-                total_count = data.get("pagination", {}).get("total_count", 0)
-
-                # no search -> fallback
-                if total_count == 0:
-                    print("No search results. Falling back to random.")
-                else:
-                    # offset 최대 4999 제한
-                    max_offset = min(total_count - 1, 4999)
-                    random_offset = random.randint(0, max_offset)
-
-                    params = {
-                        "api_key": GIPHY,
-                        "q": search,
-                        "limit": 1,
-                        "offset": random_offset,
-                        "rating": rating
-                    }
-
-                    async with session.get(GIPHY_SEARCH_URL, params=params) as resp:
-                        if resp.status != 200:
-                            await interaction.followup.send(
-                                f"⚠️ GIPHY search failed (HTTP {resp.status})"
-                            )
-                            return
-
-                        data = await resp.json()
-
-                    if data.get("data"):
-                        gif_url = data["data"][0]["images"]["original"]["url"]
-
-                        embed = discord.Embed(
-                            title=f"🎬 Random GIF for '{search}'",
-                            color=discord.Color.random()
-                        )
-                        embed.set_image(url=gif_url)
-
-                        await interaction.followup.send(embed=embed)
-                        return
+    await defer(interaction)
 
-            except Exception as e:
-                print("Search error:", e)
-
-        # =====================================================
-        # 2️⃣ else
-        # =====================================================
+    # =====================================================
+    # if search
+    # =====================================================
+    if search:
         try:
-            params = {
-                "api_key": GIPHY,
-                "rating": rating
-            }
-
-            async with session.get(GIPHY_RANDOM_URL, params=params) as resp:
-                if resp.status != 200:
-                    await interaction.followup.send(
-                        f"⚠️ GIPHY random failed (HTTP {resp.status})"
-                    )
-                    return
+            gif_url = await bot.giphy.search(search)
+        except GiphyError as e:
+            await interaction.followup.send(str(e))
+            return
+        except Exception as e:
+            print("Search error:", e)
+            gif_url = None
 
-                data = await resp.json()
+        if gif_url:
+            embed = discord.Embed(
+                title=f"🎬 Random GIF for '{search}'",
+                color=discord.Color.random()
+            )
+            embed.set_image(url=gif_url)
 
-        except Exception as e:
-            print("Random error:", e)
-            await interaction.followup.send("⚠️ Unexpected error.")
+            await interaction.followup.send(embed=embed)
             return
 
-    gif_url = data.get("data", {}).get("images", {}).get("original", {}).get("url")
+        # no search -> fallback
+        print("No search results. Falling back to random.")
+
+    # =====================================================
+    # 2️⃣ else
+    # =====================================================
+    try:
+        gif_url = await bot.giphy.random()
+    except GiphyError as e:
+        await interaction.followup.send(str(e))
+        return
+    except Exception as e:
+        print("Random error:", e)
+        await interaction.followup.send("⚠️ Unexpected error.")
+        return
 
     if not gif_url:
         await interaction.followup.send("⚠️ Failed to retrieve GIF.")
@@ -803,15 +730,59 @@ async def randomgif(interaction: discord.Interaction, search: str = None):
 # -------------------
 # token.txt
 # -------------------
-load_dotenv()
+TOKEN = os.getenv("TOKEN")
 
-wait_for_internet()
 
-TOKEN = os.getenv("TOKEN")
-GIPHY = os.getenv("GIPHY")
+async def report_health(heartbeat, interval):
+    # launcher.py supervision: a stuck event loop stops these
+    while True:
+        latency = bot.latency
+        heartbeat({
+            "ready": bot.is_ready(),
+            "shards": list(bot.shard_ids or []),
+            "guilds": len(bot.guilds),
+            "latency_ms": round(latency * 1000) if math.isfinite(latency) else None,
+            "lexicon": bot.lexicon_ready.is_set(),
+        })
+        await asyncio.sleep(interval)
+
+
+async def run_stub(stop):
+    # STUB_GATEWAY: no Discord login, only the process side (lexicon, pools, upstream client)
+    await bot.setup_hook()
+    await stop.wait()
+
+
+async def main(heartbeat=None, health_interval=5):
+    discord.utils.setup_logging()
+
+    stop = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    except NotImplementedError:
+        pass   # windows
+
+    if heartbeat is not None:
+        asyncio.create_task(report_health(heartbeat, health_interval))
+
+    if os.getenv("STUB_GATEWAY"):
+        async with bot:
+            await run_stub(stop)
+        return
+
+    await wait_for_internet()
+
+    async with bot:
+        runner = asyncio.create_task(bot.start(TOKEN))
+        stopper = asyncio.create_task(stop.wait())
+        done, _ = await asyncio.wait([runner, stopper], return_when=asyncio.FIRST_COMPLETED)
 
-GIPHY_SEARCH_URL = "https://api.giphy.com/v1/gifs/search"
-GIPHY_RANDOM_URL = "https://api.giphy.com/v1/gifs/random"
+        # SIGTERM -> regular close (sessions saved, pools shut down)
+        if stopper in done:
+            await bot.close()
+        stopper.cancel()
+        await runner
 
 
-bot.run(TOKEN)
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+import random
+import metrics
+
+
+# -------------------
+# emoji index
+# -------------------
+class EmojiIndex:
+    # every custom emoji the bot can see, split animated / static.
+    # kept up to date from guild events; add, remove and pick are O(1)
+    def __init__(self):
+        self.animated = []   # "<a:name:id>"
+        self.static = []     # "<:name:id>"
+        self.animated_ids = []   # emoji id at the same position
+        self.static_ids = []
+        self.slots = {}      # emoji id -> (items, ids, position)
+        self.guilds = {}     # guild id -> set of emoji ids
+
+        metrics.gauge("emoji_index_size", "Custom emojis indexed", fn=lambda: len(self))
+
+    def __len__(self):
+        return len(self.animated) + len(self.static)
+
+    def rebuild(self, guilds):
+        for items in (self.animated, self.static, self.animated_ids, self.static_ids):
+            items.clear()
+        self.slots.clear()
+        self.guilds.clear()
+
+        for guild in guilds:
+            self.set_guild(guild.id, guild.emojis)
+
+    def set_guild(self, guild_id, emojis):
+        old = self.guilds.get(guild_id, set())
+        new = {e.id for e in emojis}
+
+        for emoji_id in old - new:
+            self._remove(emoji_id)
+        for emoji in emojis:
+            # renamed emojis are re-added with the new text
+            self._remove(emoji.id)
+            self._add(emoji)
+
+        if new:
+            self.guilds[guild_id] = new
+        else:
+            self.guilds.pop(guild_id, None)
+
+    def remove_guild(self, guild_id):
+        for emoji_id in self.guilds.pop(guild_id, ()):
+            self._remove(emoji_id)
+
+    def _add(self, emoji):
+        items, ids = (self.animated, self.animated_ids) if emoji.animated else (self.static, self.static_ids)
+        self.slots[emoji.id] = (items, ids, len(items))
+        items.append(str(emoji))
+        ids.append(emoji.id)
+
+    def _remove(self, emoji_id):
+        slot = self.slots.pop(emoji_id, None)
+        if slot is None:
+            return
+        items, ids, i = slot
+
+        # swap with the last one, then pop
+        last_id = ids[-1]
+        items[i] = items[-1]
+        ids[i] = last_id
+        items.pop()
+        ids.pop()
+        if last_id != emoji_id:
+            self.slots[last_id] = (items, ids, i)
+
+    def pick(self, kind=None):
+        # kind: "gif" (animated), "pic" (static) or None (any). None when nothing matches
+        if kind == "gif":
+            items = self.animated
+        elif kind == "pic":
+            items = self.static
+        else:
+            i = random.randrange(len(self)) if len(self) else None
+            if i is None:
+                return None
+            return self.animated[i] if i < len(self.animated) else self.static[i - len(self.animated)]
+
+        return items[random.randrange(len(items))] if items else None
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import random
+from collections import OrderedDict, deque
+import metrics
+from upstream import SingleFlight, TTLCache, backoff
+
+GIPHY_SEARCH_URL = "https://api.giphy.com/v1/gifs/search"
+GIPHY_RANDOM_URL = "https://api.giphy.com/v1/gifs/random"
+
+MAX_OFFSET = 5000   # search results past this are not served
+
+
+class GiphyError(Exception):
+    # message is sent to the user as is
+    pass
+
+
+def normalize_search(term):
+    return " ".join(term.lower().split())
+
+
+def gif_url(gif):
+    return gif.get("images", {}).get("original", {}).get("url")
+
+
+# -------------------
+# giphy
+# -------------------
+class Giphy:
+    # GIPHY (api key), GIPHY_RATING, GIPHY_TOTAL_TTL (seconds), GIPHY_PAGE_SIZE (results per search call),
+    # GIPHY_TERMS (search terms buffered), GIPHY_RANDOM_BUFFER (no-search GIFs kept ready)
+    def __init__(self, client, api_key=None):
+        self.client = client
+        self.api_key = api_key or os.getenv("GIPHY")
+        self.rating = os.getenv("GIPHY_RATING", "pg-13")
+        self.page_size = int(os.getenv("GIPHY_PAGE_SIZE", 50))
+        self.max_terms = int(os.getenv("GIPHY_TERMS", 256))
+        self.random_size = int(os.getenv("GIPHY_RANDOM_BUFFER", 10))
+
+        self.totals = TTLCache(
+            "giphy_total",
+            ttl=float(os.getenv("GIPHY_TOTAL_TTL", 3600)),
+            maxsize=self.max_terms,
+        )
+        self.buffers = OrderedDict()   # term -> shuffled urls, least recently used first
+        self.refills = SingleFlight("giphy_search")
+
+        self.random_buffer = deque()
+        self._random_wanted = asyncio.Event()
+        self._task = None
+
+        self.search_hits = metrics.counter("giphy_buffer_hits_total", "GIFs served from a buffer", kind="search")
+        self.random_hits = metrics.counter("giphy_buffer_hits_total", "GIFs served from a buffer", kind="random")
+        metrics.gauge("giphy_random_buffered", "No-search GIFs ready", fn=lambda: len(self.random_buffer))
+
+    def start(self):
+        if self._task is None and self.api_key and self.random_size > 0:
+            self._task = asyncio.create_task(self._fill_random())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # --- search ---
+    async def search(self, term):
+        # url, or None when the search has no results
+        term = normalize_search(term)
+
+        if self.buffers.get(term):
+            self.search_hits.inc()
+        else:
+            await self.refills.do_until(term, lambda: self._refill(term), lambda: self.buffers.get(term))
+
+        urls = self.buffers.get(term)
+        if not urls:
+            return None
+        self.buffers.move_to_end(term)
+        return urls.pop()
+
+    async def _refill(self, term):
+        if term in self.totals.entries:
+            # known term: a (stale) refresh only re-reads the total
+            total = await self.totals.get(term, lambda: self._total(term))
+        else:
+            # first call for a term: offset 0 gives total_count and a page at once
+            total = await self.totals.get(term, lambda: self._first_page(term))
+
+        if total and not self.buffers.get(term):
+            max_offset = max(0, min(total, MAX_OFFSET) - self.page_size)
+            _, urls = await self._search_page(term, random.randint(0, max_offset))
+            self._stash(term, urls)
+
+    async def _first_page(self, term):
+        total, urls = await self._search_page(term, 0)
+        self._stash(term, urls)
+        return total
+
+    async def _total(self, term):
+        total, _ = await self._search_page(term, 0, limit=1)
+        return total
+
+    def _stash(self, term, urls):
+        random.shuffle(urls)
+        self.buffers[term] = urls
+        self.buffers.move_to_end(term)
+
+        while len(self.buffers) > self.max_terms:
+            self.buffers.popitem(last=False)
+
+    async def _search_page(self, term, offset, limit=None):
+        params = {
+            "api_key": self.api_key,
+            "q": term,
+            "limit": limit or self.page_size,
+            "offset": offset,
+            "rating": self.rating,
+        }
+
+        status, data = await self.client.fetch(GIPHY_SEARCH_URL, params, as_json=True)
+        if status != 200:
+            raise GiphyError(f"⚠️ GIPHY search failed (HTTP {status})")
+
+        total = data.get("pagination", {}).get("total_count", 0)
+        return total, [url for url in map(gif_url, data.get("data", [])) if url]
+
+    # --- random ---
+    async def random(self):
+        if self.random_buffer:
+            self.random_hits.inc()
+            url = self.random_buffer.popleft()
+        else:
+            url = await self._random_one()
+
+        self._random_wanted.set()
+        return url
+
+    async def _random_one(self):
+        params = {
+            "api_key": self.api_key,
+            "rating": self.rating,
+        }
+
+        async with self.client.request(GIPHY_RANDOM_URL, params) as resp:
+            if resp.status != 200:
+                raise GiphyError(f"⚠️ GIPHY random failed (HTTP {resp.status})")
+            with metrics.span("http_body", target="json"):
+                data = await resp.json()
+
+        return gif_url(data.get("data", {}))
+
+    async def _fill_random(self):
+        failures = 0
+
+        while True:
+            if len(self.random_buffer) >= self.random_size:
+                self._random_wanted.clear()
+                await self._random_wanted.wait()
+                continue
+
+            try:
+                url = await self._random_one()
+                failures = 0
+            except Exception as e:
+                print("GIPHY random refill failed:", e)
+                failures += 1
+                await asyncio.sleep(5 + backoff(min(failures, 6), base=1, cap=60))
+                continue
+
+            if url:
+                self.random_buffer.append(url)
@@ -0,0 +1,232 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+import urllib.request
+from dotenv import load_dotenv
+
+# -------------------
+# multi-process launcher
+# -------------------
+# splits the shards over several bot processes on this host and restarts the ones that die.
+#
+#   python launcher.py                          -> Discord's recommended shard count, one process per core
+#   python launcher.py --shards 16 --processes 4
+#   python launcher.py --stub --processes 3     -> no Discord login, try out supervision locally
+#
+# the lexicon is compiled once here; every worker mmaps the same cache file (shared page cache).
+# HEALTH_INTERVAL / HEALTH_TIMEOUT (seconds) control the heartbeat check.
+
+HEALTH_INTERVAL = float(os.getenv("HEALTH_INTERVAL", 5))
+HEALTH_TIMEOUT = float(os.getenv("HEALTH_TIMEOUT", 60))
+MAX_RESTART_DELAY = 60
+STABLE_AFTER = 300   # a worker up this long gets its restart backoff reset
+
+
+def recommended_shards(token):
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "RandomPickBot launcher"},
+    )
+    with urllib.request.urlopen(request, timeout=10) as resp:
+        return json.load(resp)["shards"]
+
+
+def shard_ranges(shard_count, processes):
+    # contiguous, as even as possible: 10 shards / 3 -> [0-3] [4-6] [7-9]
+    size, extra = divmod(shard_count, processes)
+    ranges, first = [], 0
+    for i in range(processes):
+        last = first + size + (i < extra)
+        ranges.append(list(range(first, last)))
+        first = last
+    return ranges
+
+
+def sessions_file(shard_ids):
+    # quiz sessions are per process
+    base = os.getenv("QUIZ_SESSIONS_FILE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "quiz_sessions.json")
+    root, ext = os.path.splitext(base)
+    return f"{root}.{shard_ids[0]}-{shard_ids[-1]}{ext}"
+
+
+def run_worker(index, shard_ids, shard_count, heartbeats, stub):
+    os.environ["SHARD_COUNT"] = str(shard_count)
+    os.environ["SHARD_IDS"] = f"{shard_ids[0]}-{shard_ids[-1]}"
+    os.environ["QUIZ_SESSIONS_FILE"] = sessions_file(shard_ids)
+    if os.getenv("METRICS_PORT"):
+        # one endpoint per worker: METRICS_PORT + worker index
+        os.environ["METRICS_PORT"] = str(int(os.getenv("METRICS_PORT")) + index)
+    if stub:
+        os.environ["STUB_GATEWAY"] = "1"
+
+    # SIGINT goes to the whole process group, the launcher decides
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    import asyncio
+    import bot
+
+    asyncio.run(bot.main(lambda info: heartbeats.put((index, info)), HEALTH_INTERVAL))
+
+
+# -------------------
+# supervision
+# -------------------
+class Worker:
+    def __init__(self, index, shard_ids):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.process = None
+        self.started_at = 0.0
+        self.last_seen = 0.0
+        self.info = {}
+        self.restarts = 0
+        self.delay = 1
+        self.restart_at = 0.0
+
+    def name(self):
+        return f"worker {self.index} (shards {self.shard_ids[0]}-{self.shard_ids[-1]})"
+
+    def start(self, ctx, shard_count, heartbeats, stub):
+        self.process = ctx.Process(
+            target=run_worker,
+            args=(self.index, self.shard_ids, shard_count, heartbeats, stub),
+            name=f"randompick-{self.index}",
+        )
+        self.process.start()
+        # the first heartbeat gets a full timeout
+        self.started_at = self.last_seen = time.monotonic()
+        print(f"Started {self.name()} pid {self.process.pid}")
+
+    def failed(self, reason):
+        now = time.monotonic()
+        if now - self.started_at > STABLE_AFTER:
+            self.delay = 1
+
+        print(f"{self.name()} {reason}, restart in {self.delay}s")
+        self.process = None
+        self.restarts += 1
+        self.restart_at = now + self.delay
+        self.delay = min(self.delay * 2, MAX_RESTART_DELAY)
+
+
+class Supervisor:
+    def __init__(self, shard_count, processes, stub):
+        self.shard_count = shard_count
+        self.stub = stub
+        self.ctx = multiprocessing.get_context("spawn")
+        self.heartbeats = self.ctx.Queue()
+        self.workers = [Worker(i, ids) for i, ids in enumerate(shard_ranges(shard_count, processes))]
+        self.stopping = False
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        for worker in self.workers:
+            worker.start(self.ctx, self.shard_count, self.heartbeats, self.stub)
+
+        last_status = time.monotonic()
+        while not self.stopping:
+            self.drain(timeout=1)
+            self.check()
+
+            if time.monotonic() - last_status > 60:
+                self.status()
+                last_status = time.monotonic()
+
+        self.shutdown()
+
+    def drain(self, timeout):
+        try:
+            index, info = self.heartbeats.get(timeout=timeout)
+            while True:
+                worker = self.workers[index]
+                worker.last_seen = time.monotonic()
+                worker.info = info
+                index, info = self.heartbeats.get_nowait()
+        except queue.Empty:
+            pass
+
+    def check(self):
+        now = time.monotonic()
+
+        for worker in self.workers:
+            process = worker.process
+
+            if process is None:
+                if now >= worker.restart_at:
+                    worker.start(self.ctx, self.shard_count, self.heartbeats, self.stub)
+            elif not process.is_alive():
+                worker.failed(f"exited with code {process.exitcode}")
+            elif now - worker.last_seen > HEALTH_TIMEOUT:
+                # alive but the event loop stopped answering
+                process.kill()
+                process.join(5)
+                worker.failed(f"missed heartbeats for {now - worker.last_seen:.0f}s, killed")
+
+    def status(self):
+        for worker in self.workers:
+            state = "down" if worker.process is None else json.dumps(worker.info)
+            print(f"{worker.name()}: {state}, restarts {worker.restarts}")
+
+    def shutdown(self):
+        print("Stopping workers...")
+        alive = [w.process for w in self.workers if w.process is not None and w.process.is_alive()]
+
+        # SIGTERM -> each bot closes normally (quiz sessions saved)
+        for process in alive:
+            process.terminate()
+
+        deadline = time.monotonic() + 20
+        for process in alive:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Run the bot as several sharded processes")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("SHARD_COUNT", 0)) or None,
+                        help="total shard count (default: Discord's recommendation)")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("SHARD_PROCESSES", 0)) or None,
+                        help="worker processes (default: one per core, at most one per shard)")
+    parser.add_argument("--stub", action="store_true", help="don't log in to Discord (local testing)")
+    args = parser.parse_args()
+
+    shard_count = args.shards
+    if shard_count is None:
+        if args.stub:
+            shard_count = args.processes or 2
+        else:
+            try:
+                shard_count = recommended_shards(os.getenv("TOKEN"))
+            except Exception as e:
+                print("Failed to get the recommended shard count, pass --shards:", e)
+                return 1
+
+    processes = min(args.processes or os.cpu_count() or 1, shard_count)
+
+    # compile / check the lexicon cache once, workers only mmap it
+    from lexicon import load_lexicon
+    lexicon = load_lexicon()
+    print(f"Lexicon ready: {len(lexicon)} words")
+    del lexicon
+
+    print(f"{shard_count} shards over {processes} processes")
+    Supervisor(shard_count, processes, args.stub).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,741 @@
+import array
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import nltk
+import metrics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # neighbour ranking falls back to plain python
+
+FORMAT_VERSION = 4
+MAGIC = b"RPLEX\0\0\0"
+
+DEFAULT_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "lexicon.bin")
+
+# flags column bits
+PROPER = 1     # starts with a capital letter
+INSTANCE = 2   # first synset is an instance (proper noun in WordNet terms)
+
+# 4-byte unsigned ints for offsets / ids
+U32 = "I" if array.array("I").itemsize == 4 else "L"
+
+# sections of the cache file, in file order
+SECTIONS = (
+    "words", "words_offsets", "definitions", "definitions_offsets", "normalized", "normalized_offsets",
+    "norm_ids", "pos", "flags", "bucket_ids", "pool_offsets", "pool_ids", "hard_ids", "hard_at_least",
+    "similar_offsets", "similar_ids", "similar_table", "similar_at_least",
+)
+
+# "similar" distractors
+SIMILAR_K = 12        # neighbour words kept per word
+SIMILAR_SCAN = 64     # relatives scored per synset
+SIMILAR_BATCH = 4096  # synsets ranked per vectorized batch
+
+SAMPLE_DRAWS = metrics.counter("lexicon_sample_draws_total", "Random draws made by LexiconIndex.sample")
+SAMPLE_REJECTED = metrics.counter("lexicon_sample_rejected_total", "Draws rejected as duplicates / excluded")
+SAMPLE_SCANS = metrics.counter("lexicon_sample_scans_total", "Samples that fell back to scanning the buckets")
+
+
+def normalize(word):
+    return word.replace("_", " ").replace("-", " ").lower().strip()
+
+
+def spaced(word):
+    return word.replace("_", " ").replace("-", " ")
+
+
+def get_syn_ant_hard(syn, word):
+    synonyms = set()
+    antonyms = set()
+
+    for lemma in syn.lemmas():
+        name = spaced(lemma.name())
+
+        if name != word:
+            synonyms.add(lemma.name())
+
+        for ant in lemma.antonyms():
+            antonyms.add(ant.name())
+
+    return list(synonyms), list(antonyms)
+
+
+# -------------------
+# wordnet corpus
+# -------------------
+def ensure_wordnet():
+    # only hit the NLTK index when the corpus is missing
+    try:
+        nltk.data.find("corpora/wordnet")
+    except LookupError:
+        nltk.download("wordnet")
+
+
+def wordnet_fingerprint():
+    # checksum of the installed corpus files (name, size, mtime)
+    root = nltk.data.find("corpora/wordnet")
+
+    if isinstance(root, nltk.data.ZipFilePathPointer):
+        paths = [root.zipfile.filename]
+    else:
+        paths = [os.path.join(root.path, n) for n in sorted(os.listdir(root.path))]
+
+    h = hashlib.sha256()
+    for p in paths:
+        st = os.stat(p)
+        h.update(f"{os.path.basename(p)}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+
+    return h.hexdigest()
+
+
+# -------------------
+# packed strings
+# -------------------
+class StringTable:
+    # strings packed in one UTF-8 blob; string i is blob[offsets[i]:offsets[i + 1]]
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, strings=()):
+        table = cls(bytearray(), array.array(U32, [0]))
+        for s in strings:
+            table.append(s)
+        return table
+
+    def append(self, s):
+        # only for tables built in memory (bytearray blob)
+        self.blob += s.encode("utf-8")
+        self.offsets.append(len(self.blob))
+
+    def nbytes(self):
+        return memoryview(self.blob).nbytes + memoryview(self.offsets).nbytes
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+def build_size_table(ids, offsets):
+    # ids bucketed by row size (offsets[i + 1] - offsets[i], biggest first) + cumulative counts:
+    # at_least[m] = how many ids have a row of at least m entries (they are the first ones)
+    sizes = {}
+    for i in ids:
+        sizes.setdefault(offsets[i + 1] - offsets[i], []).append(i)
+
+    table = array.array(U32)
+    at_least = array.array(U32, [0] * (max(sizes, default=0) + 1))
+
+    for size in sorted(sizes, reverse=True):
+        table.extend(sizes[size])
+        at_least[size] = len(table)
+
+    # sizes nobody has -> same count as the next bigger size
+    for m in range(len(at_least) - 2, -1, -1):
+        at_least[m] = max(at_least[m], at_least[m + 1])
+
+    return table, at_least
+
+
+def pick_sized(table, at_least, min_size):
+    # one random id with a row of at least min_size, None if there is none
+    if min_size >= len(at_least):
+        return None
+    n = at_least[min_size]
+    if not n:
+        return None
+    return table[random.randrange(n)]
+
+
+# -------------------
+# semantic neighbours
+# -------------------
+def synset_tree(synsets):
+    # first hypernym (instance hypernym, head adjective for satellites) as a tree
+    sids = {syn.name(): sid for sid, syn in enumerate(synsets)}
+    parent = array.array("i", [-1] * len(synsets))
+    children = [[] for _ in synsets]
+
+    for sid, syn in enumerate(synsets):
+        ups = syn.hypernyms() or syn.instance_hypernyms()
+        if not ups and syn.pos() == "s":
+            ups = syn.similar_tos()
+        if ups:
+            parent[sid] = sids[ups[0].name()]
+            children[parent[sid]].append(sid)
+
+    # depth from the root (root = 1), guarding against hypernym cycles
+    depth = array.array("i", [0] * len(synsets))
+    for sid in range(len(synsets)):
+        path = []
+        on_path = set()
+        s = sid
+        while s != -1 and not depth[s] and s not in on_path:
+            path.append(s)
+            on_path.add(s)
+            s = parent[s]
+        d = depth[s] if s != -1 and s not in on_path else 0
+        for s in reversed(path):
+            d += 1
+            depth[s] = d
+
+    return sids, parent, children, depth
+
+
+def relatives(sid, parent, children):
+    # (synset, lcs) near sid: descendants (2 levels) of its parent and grandparent,
+    # minus its own branch (itself, its hyponyms, its ancestors)
+    skip = {sid}
+    a = parent[sid]
+    while a != -1 and a not in skip:
+        skip.add(a)
+        a = parent[a]
+
+    out = []
+    a = parent[sid]
+    for _ in range(2):
+        if a == -1:
+            break
+        frontier = children[a]
+        for _ in range(2):
+            deeper = []
+            for c in frontier:
+                if c in skip:
+                    continue
+                out.append((c, a))
+                if len(out) >= SIMILAR_SCAN:
+                    return out
+                deeper.extend(children[c])
+            frontier = deeper
+        a = parent[a]
+
+    return out
+
+
+def rank_neighbours(owners, cands, lcs, depth, k):
+    # Wu-Palmer over the tree, 2 * depth(lcs) / (depth(a) + depth(b)), for one batch of
+    # (owner, candidate, lcs) synset triples -> {owner: best k candidates}
+    if not owners:
+        return {}
+
+    if np is not None:
+        d = np.frombuffer(depth, dtype=np.int32)
+        o = np.frombuffer(owners, dtype=np.int32)
+        c = np.frombuffer(cands, dtype=np.int32)
+        l = np.frombuffer(lcs, dtype=np.int32)
+
+        score = 2.0 * d[l] / (d[o] + d[c])
+        # stable pseudo-random tie break, so equal scores don't favour one branch
+        tie = (o.astype(np.uint64) * np.uint64(2654435761) + c.astype(np.uint64)) & np.uint64(0xffffffff)
+        order = np.lexsort((tie, -score, o))
+        o = o[order]
+        c = c[order]
+
+        starts = np.flatnonzero(np.r_[True, o[1:] != o[:-1]]).tolist() + [len(o)]
+        return {int(o[a]): c[a:min(b, a + k)].tolist() for a, b in zip(starts, starts[1:])}
+
+    rows = {}
+    for o, c, l in zip(owners, cands, lcs):
+        score = 2.0 * depth[l] / (depth[o] + depth[c])
+        rows.setdefault(o, []).append((-score, (o * 2654435761 + c) & 0xffffffff, c))
+    return {o: [c for _, _, c in heapq.nsmallest(k, row)] for o, row in rows.items()}
+
+
+def build_similar_table(synsets, primary, words, ids, norm_ids):
+    # per word: up to SIMILAR_K neighbour words of its first synset (one word per synset,
+    # never one of the answer's own lemmas) -> offsets + ids
+    sids, parent, children, depth = synset_tree(synsets)
+
+    def words_for(sid, neighbours):
+        seen = {norm_ids[ids[n]] for n in synsets[sid].lemma_names() if n in ids}
+        out = []
+        for c in neighbours:
+            for name in synsets[c].lemma_names():
+                j = ids.get(name)
+                if j is not None and norm_ids[j] not in seen:
+                    seen.add(norm_ids[j])
+                    out.append(j)
+                    break
+            if len(out) >= SIMILAR_K:
+                break
+        return out
+
+    wanted = sorted({p for p in primary if p != -1})
+    neighbour_words = {}
+
+    for start in range(0, len(wanted), SIMILAR_BATCH):
+        owners = array.array("i")
+        cands = array.array("i")
+        lcs = array.array("i")
+        for sid in wanted[start:start + SIMILAR_BATCH]:
+            for c, a in relatives(sid, parent, children):
+                owners.append(sid)
+                cands.append(c)
+                lcs.append(a)
+
+        # keep spare synsets, some collapse into already used words
+        for sid, neighbours in rank_neighbours(owners, cands, lcs, depth, SIMILAR_K * 2).items():
+            neighbour_words[sid] = words_for(sid, neighbours)
+
+    offsets = array.array(U32, [0])
+    table = array.array(U32)
+    for i in range(len(words)):
+        table.extend(neighbour_words.get(primary[i], ()))
+        offsets.append(len(table))
+
+    return offsets, table
+
+
+# -------------------
+# lexicon index
+# -------------------
+class LexiconIndex:
+    # every column is a flat buffer (bytes / array / mmap memoryview) indexed by word id;
+    # strings are only decoded for the words that are actually shown
+    def __init__(self, words, definitions, normalized, norm_ids, pos, flags,
+                 buckets, pool_offsets, pool_ids, hard_ids, hard_at_least,
+                 similar_offsets, similar_ids, similar_table, similar_at_least):
+        # one row per word id (sorted words)
+        self.words = words               # StringTable
+        self._definitions = definitions  # StringTable, first synset definition
+        self._norm_ids = norm_ids        # id of normalize(word), equal forms -> equal ids
+        self._normalized = normalized    # StringTable of the distinct normalized forms
+        self._pos = pos                  # primary POS as ASCII code, 0 -> no synsets
+        self._flags = flags              # PROPER | INSTANCE
+
+        # (pos, proper) -> word ids
+        self.buckets = buckets
+
+        # deduplicated synonym + antonym ids of the first synset
+        self._pool_offsets = pool_offsets
+        self._pool_ids = pool_ids
+
+        # hard mode candidates (non-instance words) sorted by pool size, biggest first;
+        # hard_at_least[m] = how many of them have a pool of at least m words
+        self._hard_ids = hard_ids
+        self._hard_at_least = hard_at_least
+
+        # precomputed semantic neighbours (near-miss distractors) of the first synset,
+        # plus the same "at least m" table over neighbour counts
+        self._similar_offsets = similar_offsets
+        self._similar_ids = similar_ids
+        self._similar_table = similar_table
+        self._similar_at_least = similar_at_least
+
+        self._mmap = None
+
+    # --- build from wordnet ---
+    @classmethod
+    def build(cls):
+        from nltk.corpus import wordnet
+
+        all_synsets = list(wordnet.all_synsets())
+        sids = {syn.name(): sid for sid, syn in enumerate(all_synsets)}
+
+        words = sorted({lemma.name() for syn in all_synsets for lemma in syn.lemmas()})
+        ids = {w: i for i, w in enumerate(words)}
+
+        # normalized form -> norm id (first seen order)
+        forms = {}
+        norm_ids = array.array(U32, (forms.setdefault(normalize(w), len(forms)) for w in words))
+        normalized = StringTable.pack(forms)
+        del forms
+
+        definitions = StringTable.pack()
+        pos = bytearray(len(words))
+        flags = bytearray(len(words))
+        buckets = {}
+        pool_offsets = array.array(U32, [0])
+        pool_ids = array.array(U32)
+        primary = array.array("i", [-1] * len(words))   # first synset id
+
+        for i, w in enumerate(words):
+            if w[0].isupper():
+                flags[i] |= PROPER
+
+            synsets = wordnet.synsets(w)
+            if not synsets:
+                definitions.append("")
+                pool_offsets.append(len(pool_ids))
+                continue
+
+            syn = synsets[0]
+            primary[i] = sids[syn.name()]
+            pos[i] = ord(syn.pos())
+            definitions.append(syn.definition())
+
+            if syn.instance_hypernyms():
+                flags[i] |= INSTANCE
+
+            buckets.setdefault((syn.pos(), bool(flags[i] & PROPER)), array.array(U32)).append(i)
+
+            # pool = syn + ant, normalized, without the word itself
+            syns, ants = get_syn_ant_hard(syn, w)
+            seen = {norm_ids[i]}
+            for name in syns + ants:
+                j = ids.get(name)
+                if j is None or norm_ids[j] in seen:
+                    continue
+                seen.add(norm_ids[j])
+                pool_ids.append(j)
+            pool_offsets.append(len(pool_ids))
+
+        hard_ids, hard_at_least = build_size_table(
+            (i for i in range(len(words)) if pos[i] and not flags[i] & INSTANCE), pool_offsets
+        )
+
+        similar_offsets, similar_ids = build_similar_table(all_synsets, primary, words, ids, norm_ids)
+        similar_table, similar_at_least = build_size_table(
+            (i for i in range(len(words)) if pos[i]), similar_offsets
+        )
+
+        return cls(StringTable.pack(words), definitions, normalized, norm_ids, bytes(pos), bytes(flags),
+                   buckets, pool_offsets, pool_ids, hard_ids, hard_at_least,
+                   similar_offsets, similar_ids, similar_table, similar_at_least)
+
+    # --- compiled file ---
+    def save(self, path, fingerprint):
+        bucket_ids = array.array(U32)
+        bucket_table = {}
+        for (p, proper), ids in sorted(self.buckets.items()):
+            start = len(bucket_ids)
+            bucket_ids.extend(ids)
+            bucket_table[f"{p}{int(proper)}"] = [start, len(bucket_ids)]
+
+        sections = [
+            ("words", self.words.blob, "B"),
+            ("words_offsets", self.words.offsets, U32),
+            ("definitions", self._definitions.blob, "B"),
+            ("definitions_offsets", self._definitions.offsets, U32),
+            ("normalized", self._normalized.blob, "B"),
+            ("normalized_offsets", self._normalized.offsets, U32),
+            ("norm_ids", self._norm_ids, U32),
+            ("pos", self._pos, "B"),
+            ("flags", self._flags, "B"),
+            ("bucket_ids", bucket_ids, U32),
+            ("pool_offsets", self._pool_offsets, U32),
+            ("pool_ids", self._pool_ids, U32),
+            ("hard_ids", self._hard_ids, U32),
+            ("hard_at_least", self._hard_at_least, U32),
+            ("similar_offsets", self._similar_offsets, U32),
+            ("similar_ids", self._similar_ids, U32),
+            ("similar_table", self._similar_table, U32),
+            ("similar_at_least", self._similar_at_least, U32),
+        ]
+
+        assert tuple(name for name, _, _ in sections) == SECTIONS
+
+        # section offsets are relative to the (8-aligned) data start
+        table = {}
+        data = []
+        offset = 0
+        for name, buf, typecode in sections:
+            raw = bytes(buf)
+            table[name] = [offset, len(raw), typecode]
+            pad = -len(raw) % 8
+            data.append(raw + b"\0" * pad)
+            offset += len(raw) + pad
+
+        header = json.dumps({
+            "format": FORMAT_VERSION,
+            "fingerprint": fingerprint,
+            "byteorder": sys.byteorder,
+            "count": len(self),
+            "buckets": bucket_table,
+            "sections": table,
+        }).encode("utf-8")
+        header += b" " * (-(len(MAGIC) + 4 + len(header)) % 8)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(MAGIC)
+                f.write(struct.pack("<I", len(header)))
+                f.write(header)
+                for chunk in data:
+                    f.write(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            # no half written cache left behind
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def open(cls, path, fingerprint):
+        # mmap a compiled lexicon; None if missing, stale, another version or damaged
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+        with f:
+            try:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return None
+                (header_len,) = struct.unpack("<I", f.read(4))
+                header = json.loads(f.read(header_len))
+
+                if (header.get("format") != FORMAT_VERSION
+                        or header.get("fingerprint") != fingerprint
+                        or header.get("byteorder") != sys.byteorder):
+                    return None
+
+                base = len(MAGIC) + 4 + header_len
+                if not cls._sections_fit(header, base, os.fstat(f.fileno()).st_size):
+                    print(f"Lexicon cache {path} is damaged")
+                    return None
+            except (struct.error, ValueError, KeyError, TypeError, AttributeError) as e:
+                print(f"Lexicon cache {path} is unreadable:", e)
+                return None
+
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(mm)
+
+        def section(name):
+            offset, size, typecode = header["sections"][name]
+            buf = view[base + offset:base + offset + size]
+            return buf if typecode == "B" else buf.cast(typecode)
+
+        bucket_ids = section("bucket_ids")
+        buckets = {
+            (key[:-1], key[-1] == "1"): bucket_ids[start:end]
+            for key, (start, end) in header["buckets"].items()
+        }
+
+        index = cls(
+            StringTable(section("words"), section("words_offsets")),
+            StringTable(section("definitions"), section("definitions_offsets")),
+            StringTable(section("normalized"), section("normalized_offsets")),
+            section("norm_ids"),
+            section("pos"),
+            section("flags"),
+            buckets,
+            section("pool_offsets"),
+            section("pool_ids"),
+            section("hard_ids"),
+            section("hard_at_least"),
+            section("similar_offsets"),
+            section("similar_ids"),
+            section("similar_table"),
+            section("similar_at_least"),
+        )
+        index._mmap = mm
+        return index
+
+    @staticmethod
+    def _sections_fit(header, base, file_size):
+        # every section inside the file and a whole number of items
+        # (a truncated file would otherwise map fine and fail on lookups)
+        sections = header["sections"]
+        for name in SECTIONS:
+            offset, size, typecode = sections[name]
+            if typecode not in ("B", U32) or offset < 0 or size < 0:
+                return False
+            if size % array.array(typecode).itemsize or base + offset + size > file_size:
+                return False
+
+        bucket_len = sections["bucket_ids"][1] // array.array(U32).itemsize
+        return all(0 <= start <= end <= bucket_len for start, end in header["buckets"].values())
+
+    # --- lookups ---
+    def __len__(self):
+        return len(self.words)
+
+    def word(self, i):
+        return self.words[i]
+
+    def definition(self, i):
+        return self._definitions[i]
+
+    def norm(self, i):
+        return self._normalized[self._norm_ids[i]]
+
+    def norm_id(self, i):
+        return self._norm_ids[i]
+
+    def pos(self, i):
+        p = self._pos[i]
+        return chr(p) if p else ""
+
+    def proper(self, i):
+        return bool(self._flags[i] & PROPER)
+
+    def instance(self, i):
+        return bool(self._flags[i] & INSTANCE)
+
+    def pool(self, i):
+        return self._pool_ids[self._pool_offsets[i]:self._pool_offsets[i + 1]]
+
+    def hard_candidate(self, min_pool):
+        # random non-instance word with at least min_pool syn/ant words, one draw
+        return pick_sized(self._hard_ids, self._hard_at_least, min_pool)
+
+    def neighbours(self, i):
+        return self._similar_ids[self._similar_offsets[i]:self._similar_offsets[i + 1]]
+
+    def similar_candidate(self, min_neighbours):
+        # random word with at least min_neighbours precomputed neighbours, one draw
+        return pick_sized(self._similar_table, self._similar_at_least, min_neighbours)
+
+    def random_id(self):
+        return random.randrange(len(self.words))
+
+    def sample(self, k, pos=None, proper=None, exclude=()):
+        # k distinct ids (by normalized form) from the matching buckets.
+        # pos=None / proper=None match any. exclude: norm ids to skip.
+        # may return fewer than k ids if the buckets are too small.
+        buckets = [
+            ids for (p, pr), ids in self.buckets.items()
+            if (pos is None or p == pos) and (proper is None or pr == proper)
+        ]
+        total = sum(len(ids) for ids in buckets)
+
+        seen = set(exclude)
+        picked = []
+
+        # big buckets -> random draws, rejections are rare
+        if total >= (k + len(seen)) * 4:
+            tries = k * 20
+            while len(picked) < k and tries:
+                tries -= 1
+                r = random.randrange(total)
+                for ids in buckets:
+                    if r < len(ids):
+                        i = ids[r]
+                        break
+                    r -= len(ids)
+
+                n = self._norm_ids[i]
+                if n in seen:
+                    continue
+                seen.add(n)
+                picked.append(i)
+
+            SAMPLE_DRAWS.inc(k * 20 - tries)
+            SAMPLE_REJECTED.inc(k * 20 - tries - len(picked))
+
+            if len(picked) == k:
+                return picked
+
+        SAMPLE_SCANS.inc()
+
+        # small buckets (or unlucky draws) -> scan them
+        rest = [i for ids in buckets for i in ids if self._norm_ids[i] not in seen]
+        random.shuffle(rest)
+
+        for i in rest:
+            if len(picked) >= k:
+                break
+            n = self._norm_ids[i]
+            if n in seen:
+                continue
+            seen.add(n)
+            picked.append(i)
+
+        return picked
+
+
+    def nbytes(self):
+        # bytes held by every column (shared file pages when mmapped)
+        total = self.words.nbytes() + self._definitions.nbytes() + self._normalized.nbytes()
+        for buf in (self._norm_ids, self._pos, self._flags, self._pool_offsets,
+                    self._pool_ids, self._hard_ids, self._hard_at_least,
+                    self._similar_offsets, self._similar_ids, self._similar_table,
+                    self._similar_at_least, *self.buckets.values()):
+            total += memoryview(buf).nbytes
+        return total
+
+
+def memory_report(lexicon):
+    # compact columns vs the old python lists (WORD_LIST + per word strings)
+    n = len(lexicon)
+
+    word_list = [lexicon.word(i) for i in range(n)]
+    definitions = [lexicon.definition(i) for i in range(n)]
+    normalized = [lexicon.norm(i) for i in range(n)]
+
+    def list_size(items):
+        return sys.getsizeof(items) + sum(sys.getsizeof(s) for s in items)
+
+    mib = 1024 * 1024
+    rows = [
+        ("words", list_size(word_list), lexicon.words.nbytes()),
+        ("definitions", list_size(definitions), lexicon._definitions.nbytes()),
+        ("normalized", list_size(normalized),
+         lexicon._normalized.nbytes() + memoryview(lexicon._norm_ids).nbytes),
+    ]
+
+    print(f"{n} words, mmapped: {lexicon._mmap is not None}")
+    print(f"{'column':<14}{'python list':>14}{'compact':>14}")
+    for name, old, new in rows:
+        print(f"{name:<14}{old / mib:>12.2f}MB{new / mib:>12.2f}MB")
+    print(f"{'whole index':<14}{'':>14}{lexicon.nbytes() / mib:>12.2f}MB")
+
+
+_lexicon = None
+
+
+def get_lexicon():
+    # process-wide lexicon (loaded once per process / worker)
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = load_lexicon()
+    return _lexicon
+
+
+def load_lexicon(path=None, rebuild=False):
+    # mmap the compiled lexicon, (re)compiling it first if missing or stale
+    path = path or os.getenv("LEXICON_CACHE") or DEFAULT_CACHE
+
+    ensure_wordnet()
+    fingerprint = wordnet_fingerprint()
+
+    if not rebuild:
+        index = LexiconIndex.open(path, fingerprint)
+        if index is not None:
+            return index
+
+    print(f"Compiling lexicon -> {path}")
+    index = LexiconIndex.build()
+
+    try:
+        index.save(path, fingerprint)
+    except OSError as e:
+        print("Failed to write lexicon cache:", e)
+        return index
+
+    return LexiconIndex.open(path, fingerprint) or index
+
+
+if __name__ == "__main__":
+    # python lexicon.py build [path]     -> compile the cache file
+    # python lexicon.py memreport [path] -> compact store vs python lists
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    if command == "build":
+        lexicon = load_lexicon(path, rebuild=True)
+        print(f"Lexicon compiled: {len(lexicon)} words")
+    elif command == "memreport":
+        memory_report(load_lexicon(path))
+    else:
+        print("usage: python lexicon.py build|memreport [path]")
+        sys.exit(2)
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import math
+import time
+from contextlib import contextmanager
+
+# -------------------
+# in-process metrics
+# -------------------
+# metrics are keyed by (name, labels) so the same name can be used per host / command
+REGISTRY = {}
+
+# seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Counter:
+    def __init__(self, name, help="", labels=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def get(self):
+        return self.value
+
+
+class Gauge:
+    def __init__(self, name, help="", labels=None, fn=None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.fn = fn      # read the value from fn() when set
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.fn() if self.fn else self.value
+
+
+class Histogram:
+    def __init__(self, name, help="", labels=None, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, c in zip(self.buckets + (math.inf,), self.counts):
+            seen += c
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def get(self):
+        return {"count": self.count, "sum": round(self.sum, 6), "p50": self.quantile(0.5), "p99": self.quantile(0.99)}
+
+
+def counter(name, help="", **labels):
+    key = _key(name, labels)
+    metric = REGISTRY.get(key)
+    if metric is None:
+        metric = REGISTRY[key] = Counter(name, help, labels)
+    return metric
+
+
+def gauge(name, help="", fn=None, **labels):
+    key = _key(name, labels)
+    metric = REGISTRY.get(key)
+    if metric is None:
+        metric = REGISTRY[key] = Gauge(name, help, labels, fn)
+    elif fn is not None:
+        metric.fn = fn
+    return metric
+
+
+def histogram(name, help="", buckets=DEFAULT_BUCKETS, **labels):
+    key = _key(name, labels)
+    metric = REGISTRY.get(key)
+    if metric is None:
+        metric = REGISTRY[key] = Histogram(name, help, labels, buckets)
+    return metric
+
+
+@contextmanager
+def span(name, target=""):
+    # with span("http", target=host): ...  -> span_seconds{span="http",target="..."}
+    # every stage has the same two labels, so the series can be aggregated across stages
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram("span_seconds", "Time spent per stage", span=name, target=target).observe(time.perf_counter() - start)
+
+
+def snapshot():
+    # {"name{label=value}": value}
+    out = {}
+    for metric in REGISTRY.values():
+        labels = ",".join(f"{k}={v}" for k, v in sorted(metric.labels.items()))
+        out[f"{metric.name}{{{labels}}}" if labels else metric.name] = metric.get()
+    return out
+
+
+# -------------------
+# export
+# -------------------
+def _labels(labels, extra=None):
+    items = sorted(labels.items()) + (extra or [])
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def render_prometheus():
+    # Prometheus text format 0.0.4
+    by_name = {}
+    for metric in REGISTRY.values():
+        by_name.setdefault(metric.name, []).append(metric)
+
+    lines = []
+    for name in sorted(by_name):
+        metrics = by_name[name]
+        kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(metrics[0])]
+        lines.append(f"# HELP {name} {metrics[0].help}")
+        lines.append(f"# TYPE {name} {kind}")
+
+        for metric in metrics:
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(metric.labels)} {metric.get()}")
+                continue
+
+            cumulative = 0
+            for bound, c in zip(metric.buckets + (math.inf,), metric.counts):
+                cumulative += c
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                lines.append(f"{name}_bucket{_labels(metric.labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(metric.labels)} {metric.sum}")
+            lines.append(f"{name}_count{_labels(metric.labels)} {metric.count}")
+
+    return "\n".join(lines) + "\n"
+
+
+async def serve(port, host="127.0.0.1"):
+    # minimal HTTP endpoint: GET /metrics
+    async def handle(reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/metrics", "/"):
+                status, body = "200 OK", render_prometheus().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"Metrics on http://{host}:{port}/metrics")
+    return server
+
+
+async def log_periodically(interval):
+    # one JSON line per interval (METRICS_LOG_INTERVAL)
+    while True:
+        await asyncio.sleep(interval)
+        print(json.dumps({"metrics": snapshot(), "ts": round(time.time(), 3)}, default=str))
+
+
+async def watch_loop_lag(interval=0.5):
+    # how late the event loop wakes up = how long something else held it
+    lag = histogram("event_loop_lag_seconds", "Event loop wake-up delay")
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag.observe(max(0.0, loop.time() - start - interval))
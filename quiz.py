@@ -0,0 +1,152 @@
+import random
+from collections import namedtuple
+from lexicon import get_lexicon, spaced
+
+HELL_CHOICES = 20   # Hell min choices
+MODES = ("easy", "normal", "similar", "hard")
+
+# ready to send quiz (picklable, so it can come back from a worker process)
+Quiz = namedtuple("Quiz", "mode hell definition choices correct_word")
+
+
+class QuizError(Exception):
+    # message is sent to the user as is
+    pass
+
+
+# -------------------
+# pickword
+# -------------------
+def pick_word():
+    lexicon = get_lexicon()
+
+    word_id = lexicon.random_id()
+    return lexicon.word(word_id), lexicon.definition(word_id) or "IDK"
+
+
+# -------------------
+# wordquiz
+# -------------------
+def make_quiz(mode, choice_count, hell=False):
+    lexicon = get_lexicon()
+
+    correct_id = lexicon.random_id()
+    correct_word = lexicon.word(correct_id)
+    correct_pos = lexicon.pos(correct_id)
+
+    if not correct_pos:
+        raise QuizError("Failed to get word.")
+
+    definition = lexicon.definition(correct_id)
+
+    wrong_words = []
+
+    # --------------------
+    # EASY
+    # --------------------
+    if mode == "easy":
+
+        wrong_needed = choice_count - 1
+        wrong_ids = []
+
+        while len(wrong_ids) < wrong_needed:
+            i = lexicon.random_id()
+            if i != correct_id and i not in wrong_ids:
+                wrong_ids.append(i)
+
+        wrong_words = [lexicon.word(i) for i in wrong_ids]
+
+    # --------------------
+    # NORMAL
+    # --------------------
+    elif mode == "normal":
+
+        # noun -> filter proper noun
+        proper = lexicon.proper(correct_id) if correct_pos == 'n' else None
+
+        wrong_needed = choice_count - 1
+        wrong_ids = lexicon.sample(
+            wrong_needed,
+            pos=correct_pos,
+            proper=proper,
+            exclude={lexicon.norm_id(correct_id)}
+        )
+
+        if len(wrong_ids) < wrong_needed:
+            raise QuizError("Not enough same POS words.")
+
+        wrong_words = [lexicon.word(i) for i in wrong_ids]
+
+    # --------------------
+    # SIMILAR
+    # --------------------
+    elif mode == "similar":
+
+        # near-miss distractors: precomputed semantic neighbours of the answer
+        wrong_needed = choice_count - 1
+        candidate_id = lexicon.similar_candidate(wrong_needed)
+
+        if candidate_id is None:
+            raise QuizError("Not enough similar words.")
+
+        correct_word = lexicon.word(candidate_id)
+        definition = lexicon.definition(candidate_id)
+
+        wrong_ids = random.sample(list(lexicon.neighbours(candidate_id)), wrong_needed)
+        wrong_words = [lexicon.word(i) for i in wrong_ids]
+
+    # --------------------
+    # HARD
+    # --------------------
+    elif mode == "hard":
+
+        # Hard words candidates: no proper nouns, enough syn + ant
+        # (hell only needs 1, the rest is filled below)
+        candidate_id = lexicon.hard_candidate(1 if hell else choice_count - 1)
+
+        if candidate_id is None:
+            raise QuizError("Not enough synonyms/antonyms.")
+
+        correct_word = lexicon.word(candidate_id)
+        definition = lexicon.definition(candidate_id)
+
+        # pool = syn + ant (normalized, deduplicated, precompiled)
+        pool_ids = lexicon.pool(candidate_id)
+        pool = [spaced(lexicon.word(i)) for i in pool_ids]
+
+        if hell:
+            normalized_seen = {lexicon.norm_id(i) for i in pool_ids}
+
+            # if lacking -> same POS words, then any words
+            if len(pool) < HELL_CHOICES - 1:
+                normalized_seen.add(lexicon.norm_id(candidate_id))
+
+                for pos in (lexicon.pos(candidate_id), None):
+                    ids = lexicon.sample(
+                        HELL_CHOICES - 1 - len(pool),
+                        pos=pos,
+                        exclude=normalized_seen
+                    )
+                    for i in ids:
+                        normalized_seen.add(lexicon.norm_id(i))
+                        pool.append(lexicon.word(i))
+
+                    if len(pool) >= HELL_CHOICES - 1:
+                        break
+
+            wrong_words = pool
+
+        # just hard (2~10)
+        else:
+            wrong_words = random.sample(pool, choice_count - 1)
+
+    else:
+        raise QuizError("Unknown mode.")
+
+    # --------------------
+    # selections
+    # --------------------
+    choices_list = wrong_words + [correct_word]
+    random.shuffle(choices_list)
+
+    return Quiz(mode, hell, definition, choices_list, correct_word)
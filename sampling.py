@@ -0,0 +1,328 @@
+import gzip
+import heapq
+import io
+import math
+import os
+import random
+import struct
+from functools import lru_cache
+import metrics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # bulk draws fall back to plain python
+
+MAX_PICKS = int(os.getenv("PICK_MAX_COUNT", 1_000_000))
+MAX_TRIALS = int(os.getenv("TESTPERCENT_MAX_TRIALS", 10_000_000))
+MAX_INLINE = 20      # more than this goes into an attached file
+HIST_BINS = 10
+HIST_WIDTH = 24
+REDRAW_ROUNDS = 32   # unique float draws give up after this many rounds
+
+_rng = np.random.default_rng() if np is not None else None
+
+
+# -------------------
+# draws
+# -------------------
+def floyd_sample(lo, hi, k):
+    # k distinct ints from lo..hi in O(k) time / memory, the range is never built.
+    # Floyd's set comes out unordered -> shuffled afterwards
+    n = hi - lo + 1
+    chosen = set()
+
+    for j in range(n - k, n):
+        t = random.randint(0, j)
+        chosen.add(j if t in chosen else t)
+
+    out = [lo + v for v in chosen]
+    random.shuffle(out)
+    return out
+
+
+def sparse_sample(lo, hi, k):
+    # numpy version for k << range: draw a few extra, keep first occurrences in draw order
+    values = np.empty(0, dtype=np.int64)
+
+    while len(values) < k:
+        extra = _rng.integers(lo, hi, size=(k - len(values)) * 11 // 10 + 16, endpoint=True)
+        merged = np.concatenate([values, extra])
+        _, first = np.unique(merged, return_index=True)
+        values = merged[np.sort(first)]
+
+    return values[:k]
+
+
+def pick_ints(lo, hi, count, unique=False):
+    # list, or a numpy array for bulk draws
+    n = hi - lo + 1
+    vectorized = np is not None and count > 1 and -2 ** 62 < lo and hi < 2 ** 62
+
+    if unique:
+        if count > n:
+            raise ValueError(f"Only {n} numbers in {lo} - {hi}")
+        # dense: the range is at most 2 * count long anyway
+        if count * 2 > n:
+            return random.sample(range(lo, hi + 1), count)
+        if vectorized:
+            return sparse_sample(lo, hi, count)
+        return floyd_sample(lo, hi, count)
+
+    if vectorized:
+        return _rng.integers(lo, hi, size=count, endpoint=True)
+    return [random.randint(lo, hi) for _ in range(count)]
+
+
+def _float_ordinal(x):
+    # doubles in order -> consecutive ints (0.0 and -0.0 both 0)
+    n = struct.unpack("<q", struct.pack("<d", x))[0]
+    return n if n >= 0 else -(n & 0x7fffffffffffffff)
+
+
+def float_count(lo, hi):
+    # distinct doubles in lo..hi
+    return _float_ordinal(hi) - _float_ordinal(lo) + 1
+
+
+def pick_floats(lo, hi, count, unique=False):
+    if unique and count > 1:
+        # draws need room to miss each other; a range this narrow would redraw forever
+        if float_count(lo, hi) < 2 * count:
+            raise ValueError(f"Not enough distinct numbers in {lo} - {hi} for {count} unique picks")
+
+    if np is not None and count > 1:
+        values = _rng.uniform(lo, hi, size=count)
+        if unique:
+            # repeats are rare, redraw a bounded number of times
+            values = np.unique(values)
+            for _ in range(REDRAW_ROUNDS):
+                if len(values) >= count:
+                    break
+                values = np.unique(np.concatenate([values, _rng.uniform(lo, hi, size=count - len(values))]))
+            if len(values) < count:
+                raise ValueError(f"Could not draw {count} unique numbers in {lo} - {hi}")
+            _rng.shuffle(values)
+        return values
+
+    values = [random.uniform(lo, hi) for _ in range(count)]
+    if unique:
+        seen = set(values)
+        for _ in range(REDRAW_ROUNDS * count):
+            if len(seen) >= count:
+                break
+            seen.add(random.uniform(lo, hi))
+        if len(seen) < count:
+            raise ValueError(f"Could not draw {count} unique numbers in {lo} - {hi}")
+        values = list(seen)
+        random.shuffle(values)
+    return values
+
+
+# -------------------
+# weighted picks
+# -------------------
+def parse_weighted(text):
+    # "alice:3, bob, carol:0.5" (commas or new lines) -> (names, weights).
+    # a name given twice gets the weights added up
+    weights = {}
+
+    for part in text.replace("\n", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+
+        name, weight = part, 1.0
+        if ":" in part:
+            head, tail = part.rsplit(":", 1)
+            try:
+                name, weight = head.strip(), float(tail)
+            except ValueError:
+                pass   # the colon is part of the name
+
+        if not name or not math.isfinite(weight) or weight <= 0:
+            raise ValueError(f"Bad item: '{part}' (weights must be > 0)")
+        weights[name] = weights.get(name, 0.0) + weight
+
+    if not weights:
+        raise ValueError("No items to pick from")
+    return tuple(weights), tuple(weights.values())
+
+
+class AliasTable:
+    # Vose's alias method: O(n) to build, O(1) per draw
+    __slots__ = ("n", "prob", "alias")
+
+    def __init__(self, weights):
+        n = self.n = len(weights)
+        total = math.fsum(weights)
+        scaled = [w * n / total for w in weights]
+
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] -= 1 - scaled[s]
+            (small if scaled[l] < 1 else large).append(l)
+        # leftovers are 1 up to rounding
+
+        if np is not None:
+            self.prob = np.array(prob)
+            self.alias = np.array(alias)
+        else:
+            self.prob = prob
+            self.alias = alias
+
+    def draw(self, k):
+        # k indexes, with replacement
+        if np is not None and k > 1:
+            i = _rng.integers(0, self.n, size=k)
+            return np.where(_rng.random(k) < self.prob[i], i, self.alias[i])
+
+        out = []
+        for _ in range(k):
+            i = random.randrange(self.n)
+            out.append(i if random.random() < self.prob[i] else int(self.alias[i]))
+        return out
+
+
+@lru_cache(maxsize=int(os.getenv("PICKFROM_CACHE", 256)))
+def alias_table(weights):
+    # same weights (same raffle) -> same table, the names don't matter
+    return AliasTable(weights)
+
+
+metrics.gauge("pickfrom_alias_cache_hits", "Alias tables reused", fn=lambda: alias_table.cache_info().hits)
+metrics.gauge("pickfrom_alias_cache_misses", "Alias tables built", fn=lambda: alias_table.cache_info().misses)
+
+
+def weighted_sample(weights, k):
+    # k distinct indexes, Efraimidis-Spirakis: top k of u ** (1 / w) (as log(u) / w)
+    if np is not None and k > 1:
+        keys = np.log(_rng.random(len(weights))) / np.asarray(weights)
+        top = np.argpartition(-keys, k - 1)[:k]
+        return top[np.argsort(-keys[top])]
+
+    return heapq.nlargest(k, range(len(weights)), key=lambda i: math.log(1.0 - random.random()) / weights[i])
+
+
+def pick_weighted(names, weights, count, unique=False):
+    if unique:
+        if count > len(names):
+            raise ValueError(f"Only {len(names)} items to pick from")
+        if len(set(weights)) == 1:
+            return random.sample(names, count)
+        picked = weighted_sample(weights, count)
+    else:
+        picked = alias_table(weights).draw(count)
+
+    return [names[i] for i in (picked.tolist() if hasattr(picked, "tolist") else picked)]
+
+
+# -------------------
+# trials
+# -------------------
+# one binomial draw instead of n rolls (numpy, or python 3.12+)
+FAST_TRIALS = np is not None or hasattr(random, "binomialvariate")
+
+
+def run_trials(p, n):
+    # successes in n rolls with chance p
+    if p <= 0 or p >= 1:
+        return n if p >= 1 else 0
+    if np is not None:
+        return int(_rng.binomial(n, p))
+    if hasattr(random, "binomialvariate"):
+        return random.binomialvariate(n, p)
+    return sum(random.random() < p for _ in range(n))
+
+
+def wilson_interval(successes, n, z=1.959963984540054):
+    # 95% score interval, fine near 0% / 100% too
+    phat = successes / n
+    denom = 1 + z * z / n
+    center = (phat + z * z / (2 * n)) / denom
+    half = z * math.sqrt(phat * (1 - phat) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+# -------------------
+# reporting
+# -------------------
+def histogram(values, lo, hi, bins=HIST_BINS):
+    # [(bin start, count)]
+    if hi <= lo:
+        return [(lo, len(values))]
+
+    if np is not None:
+        counts, edges = np.histogram(np.asarray(values, dtype=float), bins=bins, range=(lo, hi))
+        return list(zip(edges[:-1].tolist(), counts.tolist()))
+
+    width = (hi - lo) / bins
+    counts = [0] * bins
+    for v in values:
+        counts[min(int((v - lo) / width), bins - 1)] += 1
+    return [(lo + i * width, c) for i, c in enumerate(counts)]
+
+
+def summary(values, lo, hi, is_int):
+    # count / min / max / mean + a text histogram
+    if np is not None and not isinstance(values, list):
+        low, high, mean = values.min().item(), values.max().item(), values.mean().item()
+    else:
+        low, high, mean = min(values), max(values), math.fsum(values) / len(values)
+
+    if is_int:
+        # whole numbers per bin
+        rows = histogram(values, lo, hi + 1, bins=min(HIST_BINS, hi - lo + 1))
+    else:
+        rows = histogram(values, lo, hi)
+    peak = max(c for _, c in rows) or 1
+
+    lines = [
+        f"count {len(values)}  min {low}  max {high}  mean {mean:.4f}",
+        "",
+    ]
+    for start, c in rows:
+        label = f"{math.ceil(start)}" if is_int else f"{start:.4g}"
+        lines.append(f"{label:>14} | {'█' * round(HIST_WIDTH * c / peak):<{HIST_WIDTH}} {c}")
+
+    return "\n".join(lines)
+
+
+def tally(values, top=10):
+    # most picked first
+    counts = {}
+    for v in values:
+        counts[v] = counts.get(v, 0) + 1
+    rows = sorted(counts.items(), key=lambda kv: -kv[1])[:top]
+    width = max(len(str(name)) for name, _ in rows)
+    return "\n".join(f"{str(name):>{width}}  {c}" for name, c in rows)
+
+
+def to_file(values):
+    # one value per line
+    buf = io.BytesIO()
+    if np is not None and not isinstance(values, list):
+        np.savetxt(buf, values, fmt="%d" if values.dtype.kind in "iu" else "%.17g")
+    else:
+        buf.write("\n".join(map(str, values)).encode())
+        buf.write(b"\n")
+    buf.seek(0)
+    return buf
+
+
+def fit_file(values, limit):
+    # to_file under an upload limit: (buf, ".txt"), gzipped (buf, ".txt.gz") or None if neither fits
+    buf = to_file(values)
+    if buf.getbuffer().nbytes <= limit:
+        return buf, ".txt"
+    packed = gzip.compress(buf.getvalue(), compresslevel=6, mtime=0)
+    if len(packed) <= limit:
+        return io.BytesIO(packed), ".txt.gz"
+    return None
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import math
+import os
+import time
+import discord
+import metrics
+from lexicon import normalize
+
+DEFAULT_SESSIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "quiz_sessions.json")
+TOKEN_LIFETIME = 15 * 60   # interaction tokens stop working after 15 minutes
+
+
+# -------------------
+# quiz session
+# -------------------
+class QuizSession:
+    __slots__ = ("message_id", "channel_id", "token", "definition", "choices", "correct_word", "correct", "deadline")
+
+    def __init__(self, definition, choices, correct_word, deadline, correct=None,
+                 message_id=None, channel_id=None, token=None):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.token = token              # interaction token (webhook edits, valid 15 minutes)
+        self.definition = definition
+        self.choices = choices
+        self.correct_word = correct_word
+        # every choice with the same normalized form counts as right
+        if correct is None:
+            n = normalize(correct_word)
+            correct = [i for i, c in enumerate(choices) if normalize(c) == n]
+        self.correct = correct
+        self.deadline = deadline        # unix time
+
+    @classmethod
+    def from_quiz(cls, quiz, timeout):
+        return cls(quiz.definition, quiz.choices, quiz.correct_word, time.time() + timeout)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class QuizChoice(discord.ui.DynamicItem[discord.ui.Button], template=r"wordquiz:(?P<index>[0-9]+)"):
+    # stable custom_id -> presses resolve for any quiz message, even after a restart
+    def __init__(self, index, label="?", style=discord.ButtonStyle.primary, disabled=False):
+        super().__init__(
+            discord.ui.Button(label=label, style=style, disabled=disabled, custom_id=f"wordquiz:{index}")
+        )
+        self.index = index
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["index"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        await interaction.client.quiz_sessions.answer(interaction, self.index)
+
+
+def quiz_view(session, reveal=False):
+    # only dynamic items -> discord.py keeps no per message view state
+    view = discord.ui.View(timeout=None)
+
+    for i, label in enumerate(session.choices):
+        if not reveal:
+            style = discord.ButtonStyle.primary
+        elif i in session.correct:
+            style = discord.ButtonStyle.success
+        else:
+            style = discord.ButtonStyle.danger
+
+        view.add_item(QuizChoice(i, label, style, disabled=reveal))
+
+    return view
+
+
+# -------------------
+# timer wheel
+# -------------------
+class TimerWheel:
+    # one slot per tick; a whole slot expires at once
+    def __init__(self, tick=1.0, slots=64):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.cursor = None   # last tick swept
+
+    def add(self, key, deadline):
+        t = math.ceil(deadline / self.tick)
+        if self.cursor is not None and t <= self.cursor:
+            t = self.cursor + 1
+        self.slots[t % len(self.slots)].append((t, key))
+
+    def advance(self, now):
+        # keys whose deadline is <= now
+        t_now = int(now / self.tick)
+        if self.cursor is None:
+            self.cursor = t_now - 1
+
+        due = []
+        # after a long stall every slot is still swept only once
+        for t in range(max(self.cursor + 1, t_now - len(self.slots) + 1), t_now + 1):
+            slot = self.slots[t % len(self.slots)]
+            if not slot:
+                continue
+            due.extend(key for at, key in slot if at <= t_now)
+            slot[:] = [(at, key) for at, key in slot if at > t_now]
+
+        self.cursor = t_now
+        return due
+
+
+# -------------------
+# session registry
+# -------------------
+class QuizSessions:
+    # every live quiz keyed by message id, expired in batches by one task.
+    # QUIZ_MAX_SESSIONS bounds memory (oldest quiz times out early), QUIZ_SESSIONS_FILE survives restarts
+    def __init__(self, client, timeout=30, max_sessions=None, path=None):
+        self.client = client
+        self.timeout = timeout
+        self.max_sessions = int(max_sessions or os.getenv("QUIZ_MAX_SESSIONS", 10000))
+        self.path = path or os.getenv("QUIZ_SESSIONS_FILE") or DEFAULT_SESSIONS_FILE
+
+        self.sessions = {}   # message_id -> QuizSession, oldest first
+        self.wheel = TimerWheel()
+        self._evicted = []
+        self._task = None
+
+        metrics.gauge("quiz_sessions_live", "Quizzes waiting for an answer", fn=lambda: len(self.sessions))
+        self.expired = metrics.counter("quiz_sessions_expired_total", "Quizzes that timed out")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def new(self, quiz):
+        return QuizSession.from_quiz(quiz, self.timeout)
+
+    def add(self, session, interaction, message):
+        session.message_id = message.id
+        session.channel_id = message.channel.id
+        session.token = interaction.token
+
+        while len(self.sessions) >= self.max_sessions:
+            oldest = next(iter(self.sessions))
+            self._evicted.append(self.sessions.pop(oldest))
+
+        self.sessions[session.message_id] = session
+        self.wheel.add(session.message_id, session.deadline)
+
+    async def answer(self, interaction, index):
+        session = self.sessions.pop(interaction.message.id, None)
+
+        if session is None:
+            await interaction.response.send_message("This quiz is already over.", ephemeral=True)
+            return
+
+        if index in session.correct:
+            result = (
+                "<:mikuwow:1441065277579198525>\n"
+                f"You're Right! Correct answer: **{session.correct_word}**"
+            )
+        else:
+            result = (
+                "<:mikucry:1441064496041820221>\n"
+                f"It's Wrong... Correct answer: **{session.correct_word}**"
+            )
+
+        await interaction.response.edit_message(
+            content=f"📖 Definition:\n{session.definition}\n\n{result}",
+            view=quiz_view(session, reveal=True)
+        )
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+
+            now = time.time()
+            batch, self._evicted = self._evicted, []
+
+            for message_id in self.wheel.advance(now):
+                session = self.sessions.get(message_id)
+                # answered quizzes are already gone
+                if session is not None and session.deadline <= now:
+                    batch.append(self.sessions.pop(message_id))
+
+            if batch:
+                self.expired.inc(len(batch))
+                await asyncio.gather(*(self._time_up(s) for s in batch), return_exceptions=True)
+
+    async def _time_up(self, session):
+        content = (
+            f"📖 Definition:\n{session.definition}\n\n"
+            "<:mikucry:1441064496041820221>\n"
+            f"Time's up!\nCorrect answer: **{session.correct_word}**"
+        )
+        view = quiz_view(session, reveal=True)
+
+        try:
+            # same route the interaction response used
+            webhook = discord.Webhook.partial(self.client.application_id, session.token, client=self.client)
+            await webhook.edit_message(session.message_id, content=content, view=view)
+        except discord.HTTPException:
+            # token expired (restart) -> plain message edit
+            try:
+                channel = self.client.get_partial_messageable(session.channel_id)
+                await channel.get_partial_message(session.message_id).edit(content=content, view=view)
+            except discord.HTTPException as e:
+                print("Failed to close quiz:", e)
+
+    # --- restarts ---
+    def save(self):
+        # the file holds live interaction tokens -> owner only, and nothing past the token's lifetime
+        # (a session's token was issued `timeout` seconds before its deadline)
+        cutoff = time.time() - TOKEN_LIFETIME + self.timeout
+        sessions = [s.to_dict() for s in (*self._evicted, *self.sessions.values()) if s.deadline > cutoff]
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump(sessions, f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                sessions = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print("Failed to load quiz sessions:", e)
+            return
+
+        now = time.time()
+        for data in sessions:
+            session = QuizSession(**data)
+            if session.deadline <= now:
+                # already expired -> closed on the first tick, not when the wheel comes round
+                self._evicted.append(session)
+                continue
+            self.sessions[session.message_id] = session
+            self.wheel.add(session.message_id, session.deadline)
+
+        print(f"Quiz sessions restored: {len(sessions)}")
@@ -0,0 +1,392 @@
+import asyncio
+import email.utils
+import os
+import random
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+import aiohttp
+import metrics
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    # host unhealthy (circuit open) or it asked us to wait too long
+    pass
+
+
+# -------------------
+# shared http client
+# -------------------
+class HttpClient:
+    # one pooled aiohttp session for every outbound call (Safebooru, GIPHY, ...).
+    # HTTP_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_LIMIT, HTTP_LIMIT_PER_HOST, HTTP_KEEPALIVE, HTTP_DNS_TTL
+    # per host: HTTP_RATE / HTTP_BURST (requests per second), HTTP_RETRIES (extra attempts per request),
+    # HTTP_RETRY_RATIO (retries earned per request), HTTP_RETRY_MAX_WAIT (longest Retry-After we sit out),
+    # HTTP_BREAKER_FAILURES (failures in a row to open), HTTP_BREAKER_RESET (seconds before a probe)
+    def __init__(self):
+        self.timeout = float(os.getenv("HTTP_TIMEOUT", 10))
+        self.connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3))
+        self.limit = int(os.getenv("HTTP_LIMIT", 100))
+        self.limit_per_host = int(os.getenv("HTTP_LIMIT_PER_HOST", 20))
+        self.keepalive = float(os.getenv("HTTP_KEEPALIVE", 60))
+        self.dns_ttl = int(os.getenv("HTTP_DNS_TTL", 300))
+
+        self.rate = float(os.getenv("HTTP_RATE", 10))
+        self.burst = float(os.getenv("HTTP_BURST", 20))
+        self.retries = int(os.getenv("HTTP_RETRIES", 2))
+        self.retry_ratio = float(os.getenv("HTTP_RETRY_RATIO", 0.2))
+        self.retry_max_wait = float(os.getenv("HTTP_RETRY_MAX_WAIT", 5))
+        self.breaker_failures = int(os.getenv("HTTP_BREAKER_FAILURES", 5))
+        self.breaker_reset = float(os.getenv("HTTP_BREAKER_RESET", 30))
+
+        self.hosts = {}   # host -> HostGuard
+
+        self.session = None
+        # identical concurrent fetch() calls share one request
+        self.flight = SingleFlight("http")
+
+    async def start(self):
+        if self.session is not None:
+            return
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_connection_create_end.append(self._on_connection_new)
+        trace.on_connection_reuseconn.append(self._on_connection_reused)
+        trace.on_dns_cache_hit.append(self._on_dns_hit)
+        trace.on_dns_cache_miss.append(self._on_dns_miss)
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_ttl,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout, connect=self.connect_timeout),
+            trace_configs=[trace],
+        )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    @asynccontextmanager
+    async def request(self, url, params=None):
+        # async with client.request(url, params) as resp -> rate limited, retried, behind the host's breaker
+        resp = await self._send(url, params)
+        try:
+            yield resp
+        finally:
+            resp.release()
+
+    def _guard(self, host):
+        guard = self.hosts.get(host)
+        if guard is None:
+            guard = self.hosts[host] = HostGuard(host, self)
+        return guard
+
+    async def _send(self, url, params):
+        guard = self._guard(urlsplit(url).hostname)
+        guard.retry_budget.earn()
+        attempt = 0
+
+        while True:
+            if not guard.breaker.allow():
+                guard.fast_failures.inc()
+                raise UpstreamError(f"{guard.host} is unavailable")
+            await guard.limiter.acquire()
+
+            try:
+                # time to response headers, per attempt
+                with metrics.span("http", target=guard.host):
+                    resp = await self.session.get(url, params=params)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                guard.breaker.failure()
+                if attempt >= self.retries or not guard.retry_budget.spend():
+                    raise
+                wait = backoff(attempt)
+            else:
+                if resp.status not in RETRY_STATUSES:
+                    guard.breaker.success()
+                    return resp
+
+                guard.breaker.failure()
+                if attempt >= self.retries or not guard.retry_budget.spend():
+                    return resp
+
+                wait = max(backoff(attempt), retry_after(resp))
+                if wait > self.retry_max_wait:
+                    return resp
+                resp.release()
+
+            attempt += 1
+            guard.retried.inc()
+            await asyncio.sleep(wait)
+
+    async def fetch(self, url, params=None, as_json=False):
+        # -> (status, body or None). callers that ask for the same url + params at the
+        # same time get the same body object, so treat it as read only
+        key = (url, tuple(sorted((params or {}).items())), as_json)
+        return await self.flight.do(key, lambda: self._fetch(url, params, as_json))
+
+    async def _fetch(self, url, params, as_json):
+        async with self.request(url, params) as resp:
+            if resp.status != 200:
+                return resp.status, None
+            with metrics.span("http_body", target="json" if as_json else "text"):
+                body = await (resp.json() if as_json else resp.text())
+            return resp.status, body
+
+    # --- connection reuse metrics ---
+    @staticmethod
+    async def _on_request_start(session, ctx, params):
+        ctx.host = params.url.host
+        metrics.counter("http_requests_total", "Outbound HTTP requests", host=ctx.host).inc()
+
+    @staticmethod
+    async def _on_connection_new(session, ctx, params):
+        metrics.counter("http_connections_new_total", "New TCP/TLS connections", host=ctx.host).inc()
+
+    @staticmethod
+    async def _on_connection_reused(session, ctx, params):
+        metrics.counter("http_connections_reused_total", "Requests served on a kept-alive connection", host=ctx.host).inc()
+
+    @staticmethod
+    async def _on_dns_hit(session, ctx, params):
+        metrics.counter("http_dns_cache_hits_total", "DNS cache hits", host=params.host).inc()
+
+    @staticmethod
+    async def _on_dns_miss(session, ctx, params):
+        metrics.counter("http_dns_cache_misses_total", "DNS lookups", host=params.host).inc()
+
+
+# -------------------
+# per host protection
+# -------------------
+def backoff(attempt, base=0.25, cap=4.0):
+    # full jitter
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after(resp):
+    # seconds from a Retry-After header (delta seconds or HTTP date), 0 when missing
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return 0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.waits = None    # counter, set by the owner
+
+    def _fill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        self._fill()
+        # take the token now (may go negative) -> waiters queue up in order
+        self.tokens -= 1
+        if self.tokens < 0:
+            if self.waits is not None:
+                self.waits.inc()
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class RetryBudget:
+    # every request earns `ratio` of a retry, so retries stay a fixed share of traffic
+    def __init__(self, ratio, cap=10.0):
+        self.ratio = ratio
+        self.cap = cap
+        self.balance = cap
+        self.exhausted = None
+
+    def earn(self):
+        self.balance = min(self.cap, self.balance + self.ratio)
+
+    def spend(self):
+        if self.balance < 1:
+            if self.exhausted is not None:
+                self.exhausted.inc()
+            return False
+        self.balance -= 1
+        return True
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+
+    def __init__(self, host, failures, reset):
+        self.max_failures = failures
+        self.reset = reset
+        self.failures = 0
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+
+        self.opened = metrics.counter("http_circuit_opened_total", "Times the breaker opened", host=host)
+        metrics.gauge("http_circuit_state", "0 closed, 1 open, 2 half open", fn=lambda: self.state, host=host)
+
+    def allow(self):
+        if self.state == self.CLOSED:
+            return True
+        # one probe per reset period (a lost probe doesn't wedge the breaker)
+        if time.monotonic() - self.opened_at >= self.reset:
+            self.state = self.HALF_OPEN
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def success(self):
+        self.failures = 0
+        self.state = self.CLOSED
+
+    def failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.max_failures:
+            if self.state != self.OPEN:
+                self.opened.inc()
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class HostGuard:
+    def __init__(self, host, client):
+        self.host = host
+        self.limiter = TokenBucket(client.rate, client.burst)
+        self.limiter.waits = metrics.counter("http_rate_limited_total", "Requests delayed by the rate limiter", host=host)
+        self.retry_budget = RetryBudget(client.retry_ratio)
+        self.retry_budget.exhausted = metrics.counter("http_retry_budget_exhausted_total", "Retries skipped, budget empty", host=host)
+        self.breaker = CircuitBreaker(host, client.breaker_failures, client.breaker_reset)
+
+        self.retried = metrics.counter("http_retries_total", "Retried requests", host=host)
+        self.fast_failures = metrics.counter("http_fast_failures_total", "Requests refused by an open breaker", host=host)
+
+
+# -------------------
+# single flight
+# -------------------
+class SingleFlight:
+    # one in-flight call per key; everyone asking meanwhile awaits the same task.
+    # the task is shielded, so a cancelled caller doesn't cancel it for the others
+    def __init__(self, name):
+        self.calls = {}   # key -> task
+        self.leaders = metrics.counter("singleflight_calls_total", "Calls that went upstream", group=name)
+        self.coalesced = metrics.counter("singleflight_coalesced_total", "Calls that joined one in flight", group=name)
+
+    async def do(self, key, fn):
+        task = self.calls.get(key)
+
+        if task is None:
+            self.leaders.inc()
+            task = self.calls[key] = asyncio.create_task(fn())
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced.inc()
+
+        return await asyncio.shield(task)
+
+    async def do_until(self, key, fn, ready, attempts=2):
+        # do() until ready() holds; a caller that joined someone else's call may find
+        # its result already used up. True if ready() held within attempts calls
+        for _ in range(attempts):
+            await self.do(key, fn)
+            if ready():
+                return True
+        return False
+
+    def _done(self, key, task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        # every waiter may be gone already
+        if not task.cancelled():
+            task.exception()
+
+
+# -------------------
+# ttl cache
+# -------------------
+class TTLCache:
+    # async cache with TTL + LRU eviction. An expired entry is still served for stale_ttl
+    # seconds while one background task refreshes it, so hot keys never wait on upstream.
+    def __init__(self, name, ttl, maxsize, stale_ttl=None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = ttl if stale_ttl is None else stale_ttl
+        self.maxsize = maxsize
+
+        self.entries = OrderedDict()   # key -> (value, fetched_at), least recently used first
+        self._refreshing = {}          # key -> task
+
+        self.hits = metrics.counter("cache_hits_total", "Fresh cache hits", cache=name)
+        self.stale_hits = metrics.counter("cache_stale_hits_total", "Stale hits served while refreshing", cache=name)
+        self.misses = metrics.counter("cache_misses_total", "Cache misses", cache=name)
+        self.evictions = metrics.counter("cache_evictions_total", "LRU evictions", cache=name)
+        self.refresh_errors = metrics.counter("cache_refresh_errors_total", "Failed background refreshes", cache=name)
+        metrics.gauge("cache_entries", "Entries in the cache", fn=lambda: len(self.entries), cache=name)
+
+    async def get(self, key, loader):
+        # loader: no-arg coroutine function, only awaited on a miss
+        entry = self.entries.get(key)
+
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.monotonic() - fetched_at
+
+            if age < self.ttl:
+                self.hits.inc()
+                self.entries.move_to_end(key)
+                return value
+
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits.inc()
+                self.entries.move_to_end(key)
+                self._refresh(key, loader)
+                return value
+
+        self.misses.inc()
+        value = await loader()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = (value, time.monotonic())
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions.inc()
+
+    def _refresh(self, key, loader):
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                self.put(key, await loader())
+            except Exception as e:
+                self.refresh_errors.inc()
+                print(f"Cache refresh failed ({self.name} {key!r}):", e)
+            finally:
+                del self._refreshing[key]
+
+        self._refreshing[key] = asyncio.create_task(refresh())
@@ -0,0 +1,185 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import metrics
+from lexicon import get_lexicon
+from quiz import MODES, QuizError, make_quiz
+
+
+class LexiconBusy(Exception):
+    # the executor queue is full
+    pass
+
+
+# -------------------
+# lexicon executor
+# -------------------
+class LexiconExecutor:
+    # runs WordNet / lexicon work off the event loop.
+    # LEXICON_EXECUTOR = thread | process, LEXICON_WORKERS, LEXICON_QUEUE_SIZE, LEXICON_TIMEOUT (seconds)
+    def __init__(self, kind=None, workers=None, queue_size=None, timeout=None):
+        self.kind = kind or os.getenv("LEXICON_EXECUTOR", "thread")
+        self.workers = int(workers or os.getenv("LEXICON_WORKERS", 2))
+        self.queue_size = int(queue_size or os.getenv("LEXICON_QUEUE_SIZE", 64))
+        self.timeout = float(timeout or os.getenv("LEXICON_TIMEOUT", 2.5))
+
+        self._pool = None
+        self.in_flight = 0   # submitted and not finished yet
+
+        metrics.gauge(
+            "lexicon_executor_in_flight", "Lexicon jobs submitted and not finished",
+            fn=lambda: self.in_flight
+        )
+        metrics.gauge(
+            "lexicon_executor_queue_depth", "Lexicon jobs waiting for a worker",
+            fn=lambda: max(0, self.in_flight - self.workers)
+        )
+        self.rejected = metrics.counter("lexicon_executor_rejected_total", "Lexicon jobs refused (queue full)")
+        self.timeouts = metrics.counter("lexicon_executor_timeouts_total", "Lexicon jobs that missed the timeout")
+
+    def start(self):
+        if self._pool is not None:
+            return
+
+        if self.kind == "process":
+            # every worker mmaps the same compiled lexicon
+            self._pool = ProcessPoolExecutor(self.workers, initializer=get_lexicon)
+        else:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="lexicon")
+
+        print(f"Lexicon executor: {self.kind} x{self.workers}")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _done(self, future):
+        self.in_flight -= 1
+        # nobody awaits a timed out job anymore -> consume its exception
+        if not future.cancelled():
+            future.exception()
+
+    async def run(self, fn, *args):
+        # LexiconBusy when the queue is full, asyncio.TimeoutError when it takes too long
+        if self.in_flight >= self.queue_size:
+            self.rejected.inc()
+            raise LexiconBusy()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, fn, *args)
+
+        # the job keeps its slot until it really finishes, even after a timeout
+        self.in_flight += 1
+        future.add_done_callback(self._done)
+
+        try:
+            with metrics.span("lexicon", target=getattr(fn, "__name__", "call")):
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts.inc()
+            raise
+
+
+# -------------------
+# quiz prefetch
+# -------------------
+class QuizPrefetcher:
+    # ready-made quizzes per (mode, choices), refilled in the background while the executor is idle.
+    # QUIZ_PREFETCH = "easy:3,normal:3,similar:3,hard:3,hard:hell", QUIZ_PREFETCH_SIZE = quizzes per queue
+    MAX_FAILURES = 20   # QuizErrors in a row before a queue is dropped
+
+    def __init__(self, executor, spec=None, size=None):
+        self.executor = executor
+        spec = spec or os.getenv("QUIZ_PREFETCH", "easy:3,normal:3,similar:3,hard:3,hard:hell")
+        size = int(size or os.getenv("QUIZ_PREFETCH_SIZE", 16))
+
+        self.queues = {}
+        for item in spec.split(","):
+            mode, _, choices = item.strip().partition(":")
+            if not mode:
+                continue
+            if mode not in MODES:
+                raise ValueError(f"QUIZ_PREFETCH: unknown mode '{mode}'")
+
+            if choices == "hell":
+                if mode != "hard":
+                    raise ValueError(f"QUIZ_PREFETCH: hell works only in hard, got '{item.strip()}'")
+                key = (mode, None, True)
+            else:
+                if not (choices or "3").isdigit() or not 2 <= int(choices or 3) <= 10:
+                    raise ValueError(f"QUIZ_PREFETCH: choices must be 2..10 or hell, got '{item.strip()}'")
+                key = (mode, int(choices or 3), False)
+
+            queue = self.queues[key] = asyncio.Queue(maxsize=size)
+            metrics.gauge(
+                "quiz_prefetch_ready", "Prefetched quizzes waiting",
+                fn=queue.qsize, mode=mode, choices=choices or "3"
+            )
+
+        self.hits = metrics.counter("quiz_prefetch_hits_total", "Quizzes served from the prefetch queues")
+        self.misses = metrics.counter("quiz_prefetch_misses_total", "Quizzes generated on demand")
+
+        self._failures = {}   # key -> QuizErrors in a row
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None and self.queues:
+            self._task = asyncio.create_task(self._refill())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def get(self, mode, choice_count, hell):
+        # a ready quiz, or None -> generate on demand
+        queue = self.queues.get((mode, choice_count, hell))
+
+        if queue is None or queue.empty():
+            self.misses.inc()
+            self._wake.set()
+            return None
+
+        self.hits.inc()
+        self._wake.set()
+        return queue.get_nowait()
+
+    async def _refill(self):
+        while self.queues:
+            # emptiest queue first
+            key, queue = min(self.queues.items(), key=lambda kv: kv[1].qsize())
+
+            if queue.full():
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+
+            # low priority: user requests go first
+            if self.executor.in_flight:
+                await asyncio.sleep(0.05)
+                continue
+
+            mode, choice_count, hell = key
+            try:
+                quiz = await self.executor.run(make_quiz, mode, choice_count, hell)
+            except QuizError:
+                # an unlucky draw now and then is normal, a pair that never builds is not
+                failures = self._failures[key] = self._failures.get(key, 0) + 1
+                if failures >= self.MAX_FAILURES:
+                    print(f"Quiz prefetch: dropping {key}, {failures} failures in a row")
+                    del self.queues[key]
+                else:
+                    await asyncio.sleep(min(0.05 * 2 ** failures, 5))
+                continue
+            except (LexiconBusy, asyncio.TimeoutError):
+                await asyncio.sleep(1)
+                continue
+            except Exception as e:
+                print("Quiz prefetch error:", e)
+                await asyncio.sleep(5)
+                continue
+
+            self._failures.pop(key, None)
+            queue.put_nowait(quiz)